@@ -0,0 +1,361 @@
+from array import array
+import hashlib
+import mmap
+import os
+import string
+import struct
+import sys
+
+# binary lexicon layout: header followed by the transitions as little-endian uint32
+MAGIC = b'DAWG'
+VERSION = 1
+# magic, version, stride, alphabet (null padded), sha256 of the source word list
+HEADER = struct.Struct('<4sII32s32s')
+# symbol separating the reversed part of a GADDAG path from the part read forwards
+GADDAG_SEPARATOR = '>'
+
+
+class _BuildNode:
+    """
+    Mutable node used only while the Dawg is being minimized.
+    """
+    __slots__ = ('children', 'is_end_of_word', 'id')
+
+    def __init__(self):
+        self.children = {}
+        self.is_end_of_word = False
+        self.id = 0
+
+
+class DawgCursor:
+    """
+    Handle on a node of a Dawg that can be stepped one letter at a time, so
+    searches that extend a prefix don't restart from the root.
+    """
+    __slots__ = ('dawg', 'node')
+
+    def __init__(self, dawg, node):
+        """
+        Initializes the cursor at the given node.
+
+        Args:
+            dawg (Dawg): The Dawg being walked.
+            node (int): The node the cursor points at.
+        """
+        self.dawg = dawg
+        self.node = node
+
+    @property
+    def is_word(self):
+        """
+        Returns:
+            bool: True if the letters stepped so far form a word.
+        """
+        dawg = self.dawg
+        return dawg.transitions[self.node * dawg.stride + dawg.stride - 1] == 1
+
+    def step(self, letter):
+        """
+        Extends the current prefix by one letter.
+
+        Args:
+            letter (char): The letter to append.
+
+        Returns:
+            DawgCursor: The cursor for the extended prefix, or None if it is not a valid prefix.
+        """
+        dawg = self.dawg
+        index = dawg.index.get(letter)
+        if index is None:
+            return None
+        node = dawg.transitions[self.node * dawg.stride + index]
+        if not node:
+            return None
+        return DawgCursor(dawg, node)
+
+    def children(self):
+        """
+        Iterates over the letters that extend the current prefix.
+
+        Yields:
+            tuple (letter, cursor): each letter and the cursor for the extended prefix
+        """
+        dawg = self.dawg
+        row = self.node * dawg.stride
+        for i, letter in enumerate(dawg.alphabet):
+            node = dawg.transitions[row + i]
+            if node:
+                yield letter, DawgCursor(dawg, node)
+
+
+class Dawg:
+    """
+    Represents a minimized directed acyclic word graph (a Trie whose shared
+    suffixes have been merged) stored in a flat integer array.
+
+    Each node owns a row of len(alphabet) + 1 slots in transitions. Slot i holds
+    the node reached by alphabet[i] (0 when there is no such edge, which is safe
+    because nothing points back to the root) and the last slot is 1 when the
+    node ends a word.
+    """
+    def __init__(self, words=(), alphabet=string.ascii_uppercase):
+        """
+        Builds the Dawg from an iterable of words.
+
+        Args:
+            words (iterable(str)): The words to store, in any order.
+            alphabet (str, optional): The symbols words are made of.
+                Defaults to the uppercase letters.
+        """
+        self._set_alphabet(alphabet)
+        self.transitions = array('I')
+        self.checksum = b''
+        self._build(sorted(set(word for word in words if word)))
+
+    def _set_alphabet(self, alphabet):
+        """
+        Sets the alphabet and the row layout that depends on it.
+
+        Args:
+            alphabet (str): The symbols words are made of.
+        """
+        self.alphabet = alphabet
+        self.stride = len(alphabet) + 1
+        self.index = {char: i for i, char in enumerate(alphabet)}
+
+    def _build(self, words):
+        """
+        Builds the minimized graph using the incremental algorithm for sorted
+        input (Daciuk et al. 2000) and flattens it into the transitions array.
+
+        Args:
+            words (List[str]): The words to store, sorted and de-duplicated.
+        """
+        root = _BuildNode()
+        register = {}
+        # (parent, letter, child) edges along the last word that are not yet minimized
+        unchecked = []
+
+        def minimize(down_to):
+            while len(unchecked) > down_to:
+                parent, letter, child = unchecked.pop()
+                key = (child.is_end_of_word,
+                       tuple((char, node.id) for char, node in child.children.items()))
+                if key in register:
+                    parent.children[letter] = register[key]
+                else:
+                    # root is node 0, so registered nodes are numbered from 1
+                    child.id = len(register) + 1
+                    register[key] = child
+
+        previous = ''
+        for word in words:
+            common = 0
+            for a, b in zip(word, previous):
+                if a != b:
+                    break
+                common += 1
+            minimize(common)
+            node = unchecked[-1][2] if unchecked else root
+            for letter in word[common:]:
+                child = _BuildNode()
+                node.children[letter] = child
+                unchecked.append((node, letter, child))
+                node = child
+            node.is_end_of_word = True
+            previous = word
+        minimize(0)
+
+        stride = self.stride
+        transitions = array('I', bytes(4 * stride * (len(register) + 1)))
+        for node in [root] + list(register.values()):
+            row = node.id * stride
+            for letter, child in node.children.items():
+                transitions[row + self.index[letter]] = child.id
+            transitions[row + stride - 1] = node.is_end_of_word
+        self.transitions = transitions
+
+    def __len__(self):
+        """
+        Returns:
+            int: The number of nodes in the graph.
+        """
+        return len(self.transitions) // self.stride
+
+    def search(self, word):
+        """
+        Searches for a word in the Dawg.
+
+        Args:
+            word (str): The word to be searched for.
+
+        Returns:
+            bool: True if the word is found, False otherwise.
+            bool: True if word is valid prefix, False otherwise.
+        """
+        transitions = self.transitions
+        index = self.index
+        stride = self.stride
+        node = 0
+        for char in word:
+            if char not in index:
+                return False, False
+            node = transitions[node * stride + index[char]]
+            if not node:
+                return False, False
+        return transitions[node * stride + stride - 1] == 1, True
+
+    def root_cursor(self):
+        """
+        Returns:
+            DawgCursor: A cursor at the root of the Dawg (the empty prefix).
+        """
+        return DawgCursor(self, 0)
+
+    def save(self, file_name, checksum=b''):
+        """
+        Writes the Dawg to a binary lexicon file that can be opened in place.
+        The file is written next to its destination and renamed over it, so
+        processes opening it concurrently never see a partial file.
+
+        Args:
+            file_name (str): The name of the file to write.
+            checksum (bytes, optional): sha256 digest of the source word list.
+                Defaults to b''.
+        """
+        transitions = array('I', self.transitions)
+        if sys.byteorder != 'little':
+            transitions.byteswap()
+        temp_name = file_name + '.tmp' + str(os.getpid())
+        with open(temp_name, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.stride,
+                                   self.alphabet.encode('ascii'), checksum))
+            file.write(transitions.tobytes())
+        os.replace(temp_name, file_name)
+
+    @classmethod
+    def open(cls, file_name):
+        """
+        Opens a binary lexicon file written by save. The file is memory-mapped and
+        searched in place, so opening is constant time and processes on the same
+        host share its pages.
+
+        Args:
+            file_name (str): The name of the file to open.
+
+        Raises:
+            ValueError: if the file is not a lexicon file of the current version
+
+        Returns:
+            Dawg: The Dawg stored in the file.
+        """
+        magic, version, _, alphabet, checksum = read_header(file_name)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(file_name + " is not a version " + str(VERSION) + " lexicon file")
+        dawg = cls.__new__(cls)
+        dawg._set_alphabet(alphabet.rstrip(b'\0').decode('ascii'))
+        dawg.checksum = checksum
+        with open(file_name, 'rb') as file:
+            dawg._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        transitions = memoryview(dawg._mmap)[HEADER.size:].cast('I')
+        if sys.byteorder != 'little':
+            transitions = array('I', transitions)
+            transitions.byteswap()
+        dawg.transitions = transitions
+        return dawg
+
+
+def gaddag_paths(words):
+    """
+    Yields the GADDAG paths of each word: for every split of the word, the
+    letters before the split reversed, the separator, then the rest of the word.
+    Reading a path walks left from a letter of the word and then right, so a
+    Dawg of these paths can grow words in both directions from any tile.
+
+    Args:
+        words (iterable(str)): The words to encode.
+
+    Yields:
+        str: a GADDAG path, e.g. 'ERAC>' 'RAC>E' 'AC>RE' 'C>ARE' for CARE
+    """
+    for word in words:
+        for i in range(1, len(word) + 1):
+            yield word[i - 1::-1] + GADDAG_SEPARATOR + word[i:]
+
+
+def build_gaddag(words):
+    """
+    Builds the minimized GADDAG of a list of words.
+
+    Args:
+        words (iterable(str)): The words to store.
+
+    Returns:
+        Dawg: A Dawg over the letters plus the separator holding every GADDAG path.
+    """
+    return Dawg(gaddag_paths(word for word in words if word),
+                alphabet=string.ascii_uppercase + GADDAG_SEPARATOR)
+
+
+def read_header(file_name):
+    """
+    Reads the header of a binary lexicon file.
+
+    Args:
+        file_name (str): The name of the file to read.
+
+    Returns:
+        tuple (magic, version, stride, alphabet, checksum): the header fields,
+            or empty/zero fields if the file is too short to hold a header
+    """
+    with open(file_name, 'rb') as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return b'', 0, 0, b'', b''
+    return HEADER.unpack(header)
+
+
+def file_checksum(file_name):
+    """
+    Computes the sha256 digest of a file.
+
+    Args:
+        file_name (str): The name of the file to hash.
+
+    Returns:
+        bytes: The digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def load_lexicon(word_file, lexicon_file, rebuild=False, gaddag=False):
+    """
+    Opens the binary lexicon built from a word list, first (re)building it if it
+    is missing, of an older version, or was built from a different word list.
+
+    Args:
+        word_file (str): The word list, one word per line.
+        lexicon_file (str): The binary lexicon file.
+        rebuild (bool, optional): Always rebuild the lexicon file. Defaults to False.
+        gaddag (bool, optional): Build a GADDAG rather than a forward Dawg. Defaults to False.
+
+    Returns:
+        Dawg: The memory-mapped Dawg.
+    """
+    checksum = file_checksum(word_file)
+    if not rebuild and os.path.isfile(lexicon_file):
+        magic, version, _, _, built_from = read_header(lexicon_file)
+        rebuild = magic != MAGIC or version != VERSION or built_from != checksum
+    else:
+        rebuild = True
+    if rebuild:
+        with open(word_file, 'r') as file:
+            # remove newline characters
+            words = [line.strip() for line in file]
+        dawg = build_gaddag(words) if gaddag else Dawg(words)
+        dawg.save(lexicon_file, checksum)
+    return Dawg.open(lexicon_file)
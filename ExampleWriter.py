@@ -0,0 +1,411 @@
+import atexit
+import errno
+import glob
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+"""module that streams training examples to append-only shards, either JSON Lines
+or columnar NumPy arrays
+"""
+
+# columns of a columnar shard: (dtype, shape of one row). board holds the
+# ScrabbleBoard.board_state of the example, the letter counts are indexed like
+# ScrabbleBoard.letters_not_on_board and the action columns are filled by encode_action
+COLUMNS = {
+    'board': (np.uint8, (15, 15)),
+    'letters_left': (np.int8, (27,)),
+    'letters_in_hand': (np.int8, (27,)),
+    'reward': (np.float32, ()),
+    'action_score': (np.int16, ()),
+    'action_position': (np.uint8, (2,)),
+    'action_direction': (np.uint8, ()),
+    'action_word': (np.uint8, (15,)),
+    'action_tiles': (np.uint8, (7,)),
+}
+# action_direction of each direction of play
+DIRECTIONS = ['across', 'down']
+# set on the code of an action tile that is a blank
+BLANK_FLAG = 0x80
+
+
+class ExampleWriter:
+    """
+    Buffered, append-only writer of training examples. write only adds the
+    example to a buffer; a background thread serializes the buffer and appends
+    it to the current shard, one JSON object per line, every flush_interval
+    seconds or once batch_size examples are waiting. A new shard is started
+    when the current one reaches max_shard_bytes.
+
+    Shards are named <prefix>-<number>.jsonl inside directory, and a new writer
+    continues numbering after the shards already there, so it never appends to
+    a shard written by another run. read_examples streams them back.
+    """
+    def __init__(self,
+                 directory='examples',
+                 prefix='examples',
+                 max_shard_bytes=64 * 1024 * 1024,
+                 flush_interval=1.0,
+                 batch_size=1000):
+        """
+        Creates the directory if needed and starts the flush thread.
+
+        Args:
+            directory (str, optional): directory to write the shards to. Defaults to 'examples'.
+            prefix (str, optional): start of the shard file names. Defaults to 'examples'.
+            max_shard_bytes (int, optional): size at which a new shard is started.
+                Defaults to 64MB.
+            flush_interval (float, optional): most seconds an example waits in the
+                buffer. Defaults to 1.0.
+            batch_size (int, optional): number of buffered examples that triggers a
+                flush before the interval is up. Defaults to 1000.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        self.shard_number = len(shard_paths(directory, prefix))
+        self.shard_bytes = 0
+        self.file = None
+        self.buffer = []
+        self.closed = False
+        # guards the buffer and wakes the flush thread
+        self.condition = threading.Condition()
+        # serializes flushes, so the flush thread and flush() write the batches in
+        # order and don't interleave lines. Taken before condition when both are held
+        self.file_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        # examples still buffered when the interpreter exits are written out
+        atexit.register(self.close)
+
+
+    def write(self,
+              example):
+        """adds an example to the buffer, it is written out by the flush thread
+
+        Args:
+            example (dict): the example, it must be JSON serializable and is not
+                copied, so it must not be changed after it is written
+
+        Raises:
+            ValueError: if the writer is closed
+        """
+        with self.condition:
+            if self.closed:
+                raise ValueError("write to a closed ExampleWriter")
+            self.buffer.append(example)
+            if len(self.buffer) >= self.batch_size:
+                self.condition.notify()
+
+
+    def flush(self):
+        """writes out every buffered example
+        """
+        # the buffer is swapped and written under the file lock, so a batch taken
+        # by a flush can't be overtaken by a later one
+        with self.file_lock:
+            with self.condition:
+                examples = self.buffer
+                self.buffer = []
+            if not examples:
+                return
+            for example in examples:
+                line = (json.dumps(example) + '\n').encode('utf-8')
+                if self.file is None or self.shard_bytes >= self.max_shard_bytes:
+                    self._next_shard()
+                self.file.write(line)
+                self.shard_bytes += len(line)
+            self.file.flush()
+
+
+    def _next_shard(self):
+        """closes the current shard and opens the next one. Shards are created
+        exclusively, so writers in parallel processes skip the names another
+        writer has taken instead of appending to the same file
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        while self.file is None:
+            path = os.path.join(self.directory,
+                                self.prefix + '-' + str(self.shard_number).zfill(5) + '.jsonl')
+            self.shard_number += 1
+            try:
+                self.file = open(path, 'xb')
+            except FileExistsError:
+                pass
+        self.shard_bytes = 0
+
+
+    def _run(self):
+        """flush thread: flushes every flush_interval seconds, or sooner when a
+        batch is waiting, until the writer is closed
+        """
+        while True:
+            with self.condition:
+                if not self.closed and len(self.buffer) < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+                closed = self.closed
+            self.flush()
+            if closed:
+                return
+
+
+    def close(self):
+        """writes out the buffered examples, stops the flush thread and closes the shard
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        with self.file_lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        atexit.unregister(self.close)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def shard_paths(directory='examples', prefix='examples'):
+    """lists the shards written by ExampleWriter, in the order they were written
+
+    Args:
+        directory (str, optional): directory of the shards. Defaults to 'examples'.
+        prefix (str, optional): start of the shard file names. Defaults to 'examples'.
+
+    Returns:
+        List[str]: paths of the shards
+    """
+    return sorted(glob.glob(os.path.join(glob.escape(directory), glob.escape(prefix) + '-*.jsonl')))
+
+
+def read_examples(directory='examples', prefix='examples'):
+    """streams the examples written by ExampleWriter, reading one line at a time
+    so the whole data set never has to fit in memory. A partly written last line,
+    left by a run that was killed mid-flush, is skipped
+
+    Args:
+        directory (str, optional): directory of the shards. Defaults to 'examples'.
+        prefix (str, optional): start of the shard file names. Defaults to 'examples'.
+
+    Yields:
+        dict: each example, in the order they were written
+    """
+    for path in shard_paths(directory, prefix):
+        with open(path, 'r') as file:
+            for line in file:
+                if not line.endswith('\n'):
+                    break
+                yield json.loads(line)
+
+
+def encode_action(action):
+    """encodes a move into the action columns of a columnar shard. Letters are
+    stored as 1 to 26 for A to Z, padded with 0, and the tiles played as blanks
+    have BLANK_FLAG set
+
+    Args:
+        action (tuple): move as returned by Brute.get_play(2): score, word,
+            (row, col), direction and letters from hand
+
+    Returns:
+        dict: the value of each action column
+    """
+    score, word, position, direction, letters_from_hand = action
+    word_codes = np.zeros(15, dtype=np.uint8)
+    word_codes[:len(word)] = [ord(letter[0]) - 64 for letter in word]
+    tiles = np.zeros(7, dtype=np.uint8)
+    tiles[:len(letters_from_hand)] = [ord(letter[0]) - 64 | (BLANK_FLAG if len(letter) > 1 else 0)
+                                      for letter in letters_from_hand]
+    return {
+        'action_score': score,
+        'action_position': position,
+        'action_direction': DIRECTIONS.index(direction),
+        'action_word': word_codes,
+        'action_tiles': tiles,
+    }
+
+
+def decode_action(shard, index):
+    """decodes the action of one example of a columnar shard, the inverse of encode_action
+
+    Args:
+        shard (dict): columns of the shard, see read_columnar_shards
+        index (int): row of the example
+
+    Returns:
+        tuple: the move: score, word, (row, col), direction and letters from hand
+    """
+    word = ''.join(chr(code + 64) for code in shard['action_word'][index].tolist() if code)
+    letters_from_hand = [chr((code & ~BLANK_FLAG) + 64) + ('-' if code & BLANK_FLAG else '')
+                         for code in shard['action_tiles'][index].tolist() if code]
+    return (int(shard['action_score'][index]),
+            word,
+            tuple(shard['action_position'][index].tolist()),
+            DIRECTIONS[shard['action_direction'][index]],
+            letters_from_hand)
+
+
+class ColumnarExampleWriter:
+    """
+    Writer of training examples to columnar shards: each shard is a directory
+    holding one .npy file per column (see COLUMNS), so training can memory-map
+    just the columns it needs. Examples are encoded straight into preallocated
+    arrays, and a shard is saved once it holds shard_rows examples or the
+    writer is closed.
+
+    Shards are named <prefix>-<number>.npy.d inside directory and are renamed
+    into place once complete, so readers never see a partial shard. Like
+    ExampleWriter, a new writer continues numbering after the existing shards.
+    """
+    def __init__(self,
+                 directory='examples',
+                 prefix='examples',
+                 shard_rows=65536):
+        """
+        Creates the directory if needed and allocates the first shard.
+
+        Args:
+            directory (str, optional): directory to write the shards to. Defaults to 'examples'.
+            prefix (str, optional): start of the shard names. Defaults to 'examples'.
+            shard_rows (int, optional): examples per shard. Defaults to 65536.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_rows = shard_rows
+        os.makedirs(directory, exist_ok=True)
+        self.shard_number = len(columnar_shard_paths(directory, prefix))
+        self.columns = {name: np.zeros((shard_rows,) + shape, dtype=dtype)
+                        for name, (dtype, shape) in COLUMNS.items()}
+        self.rows = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        # examples still buffered when the interpreter exits are written out
+        atexit.register(self.close)
+
+
+    def write(self,
+              example):
+        """encodes an example into the current shard, saving the shard once it is full
+
+        Args:
+            example (dict): state from Brute.get_state labelled with 'reward' and
+                'action', as saved by simulation.saveExample
+
+        Raises:
+            ValueError: if the writer is closed
+        """
+        with self.lock:
+            if self.closed:
+                raise ValueError("write to a closed ColumnarExampleWriter")
+            row = self.rows
+            columns = self.columns
+            columns['board'][row] = np.reshape(example['board'], (15, 15))
+            columns['letters_left'][row] = example['letters_left']
+            columns['letters_in_hand'][row] = example['letters_in_hand']
+            columns['reward'][row] = example['reward']
+            for name, value in encode_action(example['action']).items():
+                columns[name][row] = value
+            self.rows += 1
+            if self.rows == self.shard_rows:
+                self._save_shard()
+
+
+    def flush(self):
+        """saves the examples written so far as a shard, even if it isn't full
+        """
+        with self.lock:
+            self._save_shard()
+
+
+    def _save_shard(self):
+        """saves the filled rows of the current shard and starts the next one
+        """
+        if not self.rows:
+            return
+        # a fresh temporary directory each time, so neither a directory left by a
+        # crash nor another writer can be in the way
+        temp_path = tempfile.mkdtemp(prefix=self.prefix + '.tmp', dir=self.directory)
+        # mkdtemp makes the directory private, shards are readable like other files
+        os.chmod(temp_path, 0o755)
+        for name, column in self.columns.items():
+            np.save(os.path.join(temp_path, name + '.npy'), column[:self.rows])
+        while True:
+            path = os.path.join(self.directory,
+                                self.prefix + '-' + str(self.shard_number).zfill(5) + '.npy.d')
+            self.shard_number += 1
+            # renaming onto a shard another writer has saved fails, try the next
+            # name then. os.rename replaces an empty directory, so check first
+            if os.path.exists(path):
+                continue
+            try:
+                os.rename(temp_path, path)
+                break
+            except OSError as error:
+                # only a name collision is retried. Renaming onto a directory that
+                # isn't empty fails with ENOTEMPTY on Linux rather than EEXIST
+                if error.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+        self.rows = 0
+
+
+    def close(self):
+        """saves the examples still buffered
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._save_shard()
+        atexit.unregister(self.close)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def columnar_shard_paths(directory='examples', prefix='examples'):
+    """lists the shards written by ColumnarExampleWriter, in the order they were written
+
+    Args:
+        directory (str, optional): directory of the shards. Defaults to 'examples'.
+        prefix (str, optional): start of the shard names. Defaults to 'examples'.
+
+    Returns:
+        List[str]: paths of the shards
+    """
+    return sorted(glob.glob(os.path.join(glob.escape(directory), glob.escape(prefix) + '-*.npy.d')))
+
+
+def read_columnar_shards(directory='examples', prefix='examples', mmap_mode='r'):
+    """opens the shards written by ColumnarExampleWriter one at a time
+
+    Args:
+        directory (str, optional): directory of the shards. Defaults to 'examples'.
+        prefix (str, optional): start of the shard names. Defaults to 'examples'.
+        mmap_mode (str, optional): passed to np.load, None reads the columns into
+            memory. Defaults to 'r', which memory-maps them.
+
+    Yields:
+        dict: the arrays of each column of a shard, see COLUMNS
+    """
+    for path in columnar_shard_paths(directory, prefix):
+        yield {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+               for name in COLUMNS}
@@ -0,0 +1,109 @@
+import numpy as np
+
+
+class ExperienceBuffer(object):
+    """
+    Fixed-capacity ring buffer of experiences (s, a, s', r) kept in typed NumPy
+    arrays. Once the buffer is full each new experience overwrites the oldest.
+
+    :param capacity: The most experiences kept.
+    :type capacity: int
+    """
+    def __init__(self, capacity=100000):
+        """
+        Constructor method, allocates the arrays for the full capacity
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        # index the next experience is written to, and the number stored
+        self.next_index = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, s, a, s_prime, r):
+        """
+        Store an experience, overwriting the oldest one when the buffer is full
+
+        :param s: The state
+        :type s: int
+        :param a: The action taken in the state
+        :type a: int
+        :param s_prime: The state reached
+        :type s_prime: int
+        :param r: The reward received
+        :type r: float
+        """
+        i = self.next_index
+        self.states[i] = s
+        self.actions[i] = a
+        self.next_states[i] = s_prime
+        self.rewards[i] = r
+        self.next_index = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def sample(self, size):
+        """
+        Sample experiences uniformly, with replacement
+
+        :param size: The number of experiences to sample
+        :type size: int
+        :return: The states, actions, next states and rewards of the samples
+        :rtype: tuple of numpy.ndarray
+        """
+        if self.size == 0:
+            raise ValueError("can't sample an empty ExperienceBuffer")
+        samples = np.random.randint(0, self.size, size=size)
+        return self.states[samples], self.actions[samples], \
+            self.next_states[samples], self.rewards[samples]
+
+    def save(self, file_name):
+        """
+        Save the buffer to a .npz file
+
+        :param file_name: The file to write
+        :type file_name: str
+        """
+        np.savez(file_name,
+                 states=self.states[:self.size],
+                 actions=self.actions[:self.size],
+                 next_states=self.next_states[:self.size],
+                 rewards=self.rewards[:self.size],
+                 capacity=self.capacity,
+                 next_index=self.next_index)
+
+    @classmethod
+    def load(cls, file_name, capacity=None):
+        """
+        Load a buffer written by save
+
+        :param file_name: The file to read
+        :type file_name: str
+        :param capacity: The capacity of the loaded buffer, the saved capacity if None. When it is smaller than the number of saved experiences the most recent ones are kept.
+        :type capacity: int
+        :return: The buffer
+        :rtype: ExperienceBuffer
+        """
+        with np.load(file_name) as data:
+            saved_capacity = int(data['capacity'])
+            # put the saved experiences back in the order they were added
+            order = np.arange(len(data['states']))
+            if len(order) == saved_capacity:
+                order = np.roll(order, -int(data['next_index']))
+            buffer = cls(saved_capacity if capacity is None else capacity)
+            keep = order[max(0, len(order) - buffer.capacity):]
+            n = len(keep)
+            buffer.states[:n] = data['states'][keep]
+            buffer.actions[:n] = data['actions'][keep]
+            buffer.next_states[:n] = data['next_states'][keep]
+            buffer.rewards[:n] = data['rewards'][keep]
+        buffer.size = n
+        buffer.next_index = n % buffer.capacity
+        return buffer
@@ -0,0 +1,551 @@
+"""module that generates scrabble plays from anchor squares
+"""
+import time
+import numpy as np
+from Dawg import GADDAG_SEPARATOR
+from ScrabbleBoard import ALL_LETTERS, LETTER_BITS, LETTER_MULTIPLIERS, WORD_MULTIPLIERS
+
+
+class MoveGenerator:
+    """
+    Generates plays with the Appel-Jacobson algorithm. Words are grown through
+    the dictionary from anchor squares (the empty squares a play must touch),
+    first by a left part and then rightwards, and each square only accepts the
+    letters allowed by its cross-check, so every generated play is legal.
+
+    When the game has a GADDAG loaded, words are instead grown from each anchor
+    leftwards and then rightwards through the GADDAG, which avoids building left
+    parts that can't reach the anchor's neighbours. Both searches generate the
+    same plays.
+
+    Both directions are handled by the same code: down plays are generated on
+    the transposed board, where they run across.
+
+    Generation can be bounded by a node budget, the number of dictionary nodes
+    the search may expand. The budget is split evenly between the anchors, so
+    the plays found are spread over the board rather than the first anchors
+    searched, but plays beyond each anchor's share are missed.
+    """
+    def __init__(self,
+                 game,
+                 hand,
+                 node_budget=None,
+                 deadline=None):
+        """
+        Args:
+            game (ScrabbleBoard): game to generate plays for
+            hand (List[char]): letters in hand
+            node_budget (int, optional): most dictionary nodes to expand. Defaults
+                to None, which generates every play.
+            deadline (float, optional): time.monotonic() time to stop by. It is
+                checked before each anchor is searched, and only the plays found
+                by then are returned. Defaults to None.
+        """
+        self.game = game
+        self.hand = hand
+        self.node_budget = node_budget
+        self.deadline = deadline
+        self.letter_scores = game.letter_scores
+        self.root = game._dictionary.root_cursor()
+        self.gaddag = game._gaddag
+
+
+    def generate(self):
+        """finds all legal plays for the hand, or those found within the node budget
+
+        Returns:
+            list[tuple]: A list of tuples containing the score, the word to play,
+                starting position (row, col), direction and letters from hand,
+                as returned by Brute.find_all_possible_plays
+        """
+        self.plays = []
+        self.rack = {}
+        for letter in self.hand:
+            self.rack[letter] = self.rack.get(letter, 0) + 1
+
+        board = self.game.board
+        # premiums only count on empty squares
+        empty = self.game.letters == 0
+        letter_multipliers = np.where(empty, LETTER_MULTIPLIERS, 1)
+        word_multipliers = np.where(empty, WORD_MULTIPLIERS, 1)
+        for direction in ['across', 'down']:
+            if direction == 'across':
+                grid = board
+                anchors = self.game.required_play_locations
+                is_empty = empty
+                multipliers = letter_multipliers, word_multipliers
+            else:
+                grid = [list(column) for column in zip(*board)]
+                anchors = {(col, row) for row, col in self.game.required_play_locations}
+                is_empty = empty.T
+                multipliers = letter_multipliers.T, word_multipliers.T
+            self.direction = direction
+            self._generate_direction(grid, is_empty, multipliers, anchors)
+        return self.plays
+
+
+    def _generate_direction(self, grid, empty, multipliers, anchors):
+        """generates the plays running across the given grid
+
+        Args:
+            grid (List[List[str]]): board, transposed for down plays
+            empty (np.ndarray): which squares of grid are empty
+            multipliers (tuple(np.ndarray)): letter and word multiplier of each
+                square of grid, 1 on the squares holding tiles
+            anchors (set(tuple)): anchor squares in grid coordinates
+        """
+        if not anchors:
+            # no square a play can touch, which also leaves no anchors to share
+            # the node budget between
+            return
+        self.tiles = [[None if is_empty else cell for cell, is_empty in zip(row, empty_row)]
+                      for row, empty_row in zip(grid, empty.tolist())]
+        letter_multipliers, word_multipliers = multipliers
+        self.premiums = [list(zip(letter_row, word_row)) for letter_row, word_row
+                         in zip(letter_multipliers.tolist(), word_multipliers.tolist())]
+        # the board keeps the cross-checks and cross-sums of each square up to date
+        masks = self.game.cross_checks[self.direction]
+        sums = self.game.cross_sums[self.direction]
+        if self.direction == 'across':
+            self.cross_checks = [masks[line*15:line*15 + 15] for line in range(15)]
+            self.cross_sums = [sums[line*15:line*15 + 15] for line in range(15)]
+        else:
+            self.cross_checks = [masks[line::15] for line in range(15)]
+            self.cross_sums = [sums[line::15] for line in range(15)]
+
+        self.anchors = anchors
+        # nodes each anchor may expand, the anchors are searched in both directions
+        anchor_budget = None
+        if self.node_budget is not None:
+            anchor_budget = max(1, self.node_budget // (2 * len(anchors)))
+        for line in range(15):
+            tiles = self.tiles[line]
+            self.line = line
+            for anchor in sorted(pos for (l, pos) in anchors if l == line):
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    return
+                self.anchor = anchor
+                self.nodes_left = anchor_budget
+                if self.gaddag is not None:
+                    self._gen_left(anchor, self.gaddag.root_cursor(), '', 0, 1, 0, [])
+                elif anchor > 0 and tiles[anchor - 1] is not None:
+                    # the left part is the run of tiles already on the board
+                    start = anchor - 1
+                    while start > 0 and tiles[start - 1] is not None:
+                        start -= 1
+                    cursor = self.root
+                    main_score = 0
+                    for pos in range(start, anchor):
+                        cursor = cursor.step(tiles[pos][0])
+                        if cursor is None:
+                            break
+                        main_score += self.letter_scores[tiles[pos]]
+                    else:
+                        word = ''.join(tiles[pos][0] for pos in range(start, anchor))
+                        self._extend_right(anchor, cursor, word, main_score, 1, 0, [])
+                else:
+                    # the left part can use the empty squares that nothing is attached to,
+                    # stopping at the previous anchor, which generates those plays itself
+                    limit = 0
+                    while limit < anchor and self._is_left_part_square(anchor - limit - 1):
+                        limit += 1
+                    self._left_part(self.root, '', [], limit)
+
+
+    def _is_left_part_square(self,
+                             pos):
+        """checks whether a left part may use an empty square before the anchor:
+        nothing may be attached to it, and it may not be another anchor since
+        the plays covering that anchor are generated from it
+
+        Args:
+            pos (int): square in the line
+
+        Returns:
+            bool: whether the square can hold a left part letter
+        """
+        tiles = self.tiles[self.line]
+        return (self.line, pos) not in self.anchors \
+            and self.cross_sums[self.line][pos] < 0 \
+            and (pos == 0 or tiles[pos - 1] is None) \
+            and (pos == 14 or tiles[pos + 1] is None)
+
+
+    def _options(self, cursor, allowed=ALL_LETTERS):
+        """returns the letters from the rack that extend the cursor. A blank is only
+        used for letters that aren't left in the rack, which is how the game
+        assigns blanks when it scores the play
+
+        Args:
+            cursor: dictionary cursor at the current prefix
+            allowed (int, optional): cross-check mask of the square. Defaults to ALL_LETTERS.
+
+        Returns:
+            List[tuple (letter, rack_letter, cursor)]: letter played, rack entry used
+                (the letter itself or ' ') and the cursor after the letter
+        """
+        if self.nodes_left is not None:
+            if self.nodes_left <= 0:
+                return []
+            self.nodes_left -= 1
+        rack = self.rack
+        options = []
+        if rack.get(' ', 0):
+            for letter, child in cursor.children():
+                if allowed & LETTER_BITS.get(letter, 0):
+                    options.append((letter, letter if rack.get(letter, 0) else ' ', child))
+        else:
+            for letter, count in rack.items():
+                if count and allowed & LETTER_BITS.get(letter, 0):
+                    child = cursor.step(letter)
+                    if child is not None:
+                        options.append((letter, letter, child))
+        return options
+
+
+    def _score_letter(self,
+                      pos,
+                      letter,
+                      blank):
+        """scores a letter placed from the hand on the empty square pos
+
+        Args:
+            pos (int): square in the line
+            letter (str): letter placed
+            blank (bool): whether the letter is played as a blank
+
+        Returns:
+            tuple (letter_score, multiplier, cross_score):
+                letter_score (int): score the letter adds to the main word
+                multiplier (int): word multiplier of the square
+                cross_score (int): score of the perpendicular word it forms, 0 if none
+        """
+        letter_multiplier, multiplier = self.premiums[self.line][pos]
+        letter_score = 0 if blank else self.letter_scores[letter] * letter_multiplier
+        cross_score = 0
+        cross_sum = self.cross_sums[self.line][pos]
+        if cross_sum >= 0:
+            # the game scores the letter in the perpendicular word as a blank
+            # only when that letter isn't in the hand at all
+            cross_letter_score = self.letter_scores[letter] if letter in self.hand else 0
+            cross_score = (cross_sum + cross_letter_score * letter_multiplier) * multiplier
+        return letter_score, multiplier, cross_score
+
+
+    def _placements(self,
+                    pos,
+                    cursor):
+        """places each letter from the rack that extends the cursor on the empty
+        square pos in turn. The letter is taken from the rack while the caller
+        handles it and put back when the next one is asked for, so the loop over
+        the placements must not be left early
+
+        Args:
+            pos (int): square in the line
+            cursor: dictionary cursor before pos
+
+        Yields:
+            tuple (letter, cursor, letter_score, multiplier, cross_score, scored):
+                the letter, the cursor after it, its scores from _score_letter and
+                the letter as scored, a blank marked with '-'
+        """
+        for letter, rack_letter, child in self._options(cursor, self.cross_checks[self.line][pos]):
+            blank = rack_letter == ' '
+            letter_score, multiplier, cross_score = self._score_letter(pos, letter, blank)
+            self.rack[rack_letter] -= 1
+            yield letter, child, letter_score, multiplier, cross_score, \
+                letter + '-' if blank else letter
+            self.rack[rack_letter] += 1
+
+
+    def _left_part(self,
+                   cursor,
+                   word,
+                   letters_from_hand,
+                   limit):
+        """places every left part of up to limit letters before the anchor and
+        extends each of them to the right
+
+        Args:
+            cursor: dictionary cursor at the left part
+            word (str): letters of the left part
+            letters_from_hand (List[str]): letters of the left part as scored,
+                blanks marked with '-'
+            limit (int): number of squares still free to the left
+        """
+        start = self.anchor - len(word)
+        main_score = 0
+        word_multiplier = 1
+        for i, scored in enumerate(letters_from_hand):
+            letter_score, multiplier, _ = self._score_letter(start + i, scored[0], len(scored) > 1)
+            main_score += letter_score
+            word_multiplier *= multiplier
+        self._extend_right(self.anchor, cursor, word, main_score, word_multiplier, 0,
+                           letters_from_hand)
+
+        if limit > 0:
+            for letter, rack_letter, child in self._options(cursor):
+                self.rack[rack_letter] -= 1
+                scored = letter if rack_letter != ' ' else letter + '-'
+                self._left_part(child, word + letter, letters_from_hand + [scored], limit - 1)
+                self.rack[rack_letter] += 1
+
+
+    def _extend_right(self,
+                      pos,
+                      cursor,
+                      word,
+                      main_score,
+                      word_multiplier,
+                      cross_score,
+                      letters_from_hand):
+        """extends a partial word through the square pos and records each
+        complete play that covers the anchor
+
+        Args:
+            pos (int): next square in the line
+            cursor: dictionary cursor at the partial word
+            word (str): letters of the partial word
+            main_score (int): letter score of the partial word
+            word_multiplier (int): product of the word multipliers covered
+            cross_score (int): score of the perpendicular words formed
+            letters_from_hand (List[str]): letters placed from the hand
+        """
+        tiles = self.tiles[self.line]
+        if pos < 15 and tiles[pos] is not None:
+            cursor = cursor.step(tiles[pos][0])
+            if cursor is not None:
+                self._extend_right(pos + 1, cursor, word + tiles[pos][0],
+                                   main_score + self.letter_scores[tiles[pos]],
+                                   word_multiplier, cross_score, letters_from_hand)
+            return
+
+        if pos > self.anchor and cursor.is_word:
+            self._record(pos - len(word), word, main_score * word_multiplier + cross_score,
+                         letters_from_hand)
+        if pos == 15:
+            return
+
+        for letter, child, letter_score, multiplier, letter_cross_score, scored in \
+                self._placements(pos, cursor):
+            self._extend_right(pos + 1, child, word + letter, main_score + letter_score,
+                               word_multiplier * multiplier, cross_score + letter_cross_score,
+                               letters_from_hand + [scored])
+
+
+    def _record(self,
+                start,
+                word,
+                score,
+                letters_from_hand):
+        """records a generated play
+
+        Args:
+            start (int): square of the first letter in the line
+            word (str): word played
+            score (int): score of the play before the bonus
+            letters_from_hand (List[str]): letters placed from the hand
+        """
+        if len(letters_from_hand) == 7:
+            score += 50
+        if self.direction == 'across':
+            position = (self.line, start)
+        else:
+            position = (start, self.line)
+        self.plays.append((score, word, position, self.direction, letters_from_hand))
+
+
+    def _gen_left(self,
+                  pos,
+                  cursor,
+                  word,
+                  main_score,
+                  word_multiplier,
+                  cross_score,
+                  letters_from_hand):
+        """puts a letter on the square pos, at or before the anchor, while growing
+        a word leftwards through the GADDAG. The score is kept up to date as the
+        letters are placed, like in _extend_right
+
+        Args:
+            pos (int): square in the line
+            cursor: GADDAG cursor after the reversed letters right of pos
+            word (str): letters from pos + 1 up to the anchor
+            main_score (int): letter score of word
+            word_multiplier (int): product of the word multipliers covered
+            cross_score (int): score of the perpendicular words formed
+            letters_from_hand (List[str]): letters placed from the hand, left to
+                right, blanks marked with '-'
+        """
+        tiles = self.tiles[self.line]
+        if tiles[pos] is not None:
+            cursor = cursor.step(tiles[pos][0])
+            if cursor is not None:
+                self._go_on_left(pos, cursor, tiles[pos][0] + word,
+                                 main_score + self.letter_scores[tiles[pos]],
+                                 word_multiplier, cross_score, letters_from_hand)
+            return
+        for letter, child, letter_score, multiplier, letter_cross_score, scored in \
+                self._placements(pos, cursor):
+            self._go_on_left(pos, child, letter + word, main_score + letter_score,
+                             word_multiplier * multiplier, cross_score + letter_cross_score,
+                             [scored] + letters_from_hand)
+
+
+    def _go_on_left(self,
+                    pos,
+                    cursor,
+                    word,
+                    main_score,
+                    word_multiplier,
+                    cross_score,
+                    letters_from_hand):
+        """records the word starting at pos if it can end at the anchor, then both
+        turns right through the separator and keeps growing leftwards
+
+        Args:
+            pos (int): square of the first letter of word
+            cursor: GADDAG cursor after the reversed letters of word
+            word (str): letters from pos up to the anchor
+            main_score, word_multiplier, cross_score, letters_from_hand: score of
+                word so far, see _gen_left
+        """
+        tiles = self.tiles[self.line]
+        anchor = self.anchor
+        if pos == 0 or tiles[pos - 1] is None:
+            turned = cursor.step(GADDAG_SEPARATOR)
+            if turned is not None:
+                if turned.is_word and (anchor == 14 or tiles[anchor + 1] is None):
+                    self._record_gaddag(pos, word, main_score, word_multiplier, cross_score,
+                                        letters_from_hand)
+                if anchor < 14:
+                    self._gen_right(anchor + 1, turned, pos, word, main_score, word_multiplier,
+                                    cross_score, letters_from_hand)
+        if pos > 0 and (tiles[pos - 1] is not None or self._is_left_part_square(pos - 1)):
+            self._gen_left(pos - 1, cursor, word, main_score, word_multiplier, cross_score,
+                           letters_from_hand)
+
+
+    def _gen_right(self,
+                   pos,
+                   cursor,
+                   start,
+                   word,
+                   main_score,
+                   word_multiplier,
+                   cross_score,
+                   letters_from_hand):
+        """puts a letter on the square pos, after the anchor, while growing a
+        word rightwards through the GADDAG
+
+        Args:
+            pos (int): square in the line
+            cursor: GADDAG cursor after the separator and the letters before pos
+            start (int): square of the first letter of word
+            word (str): letters from start up to pos - 1
+            main_score, word_multiplier, cross_score, letters_from_hand: score of
+                word so far, see _gen_left
+        """
+        tiles = self.tiles[self.line]
+        if tiles[pos] is not None:
+            cursor = cursor.step(tiles[pos][0])
+            if cursor is not None:
+                self._go_on_right(pos, cursor, start, word + tiles[pos][0],
+                                  main_score + self.letter_scores[tiles[pos]],
+                                  word_multiplier, cross_score, letters_from_hand)
+            return
+        for letter, child, letter_score, multiplier, letter_cross_score, scored in \
+                self._placements(pos, cursor):
+            self._go_on_right(pos, child, start, word + letter, main_score + letter_score,
+                              word_multiplier * multiplier, cross_score + letter_cross_score,
+                              letters_from_hand + [scored])
+
+
+    def _go_on_right(self,
+                     pos,
+                     cursor,
+                     start,
+                     word,
+                     main_score,
+                     word_multiplier,
+                     cross_score,
+                     letters_from_hand):
+        """records the word if it can end at pos and keeps growing rightwards
+
+        Args:
+            pos (int): square of the last letter of word
+            cursor: GADDAG cursor after the letters of word
+            start (int): square of the first letter of word
+            word (str): letters from start up to pos
+            main_score, word_multiplier, cross_score, letters_from_hand: score of
+                word so far, see _gen_left
+        """
+        tiles = self.tiles[self.line]
+        if (pos == 14 or tiles[pos + 1] is None) and cursor.is_word:
+            self._record_gaddag(start, word, main_score, word_multiplier, cross_score,
+                                letters_from_hand)
+        if pos < 14:
+            self._gen_right(pos + 1, cursor, start, word, main_score, word_multiplier,
+                            cross_score, letters_from_hand)
+
+
+    def _record_gaddag(self,
+                       start,
+                       word,
+                       main_score,
+                       word_multiplier,
+                       cross_score,
+                       letters_from_hand):
+        """records a play found through the GADDAG with the score built up while
+        placing it. Blanks were given to letters in the order they were placed,
+        which isn't left to right, so when a letter was played both from the
+        rack and as a blank the play is rescored with the game's assignment
+
+        Args:
+            start (int): square of the first letter in the line
+            word (str): word played
+            main_score, word_multiplier, cross_score, letters_from_hand: score of
+                the word, see _gen_left
+        """
+        for scored in letters_from_hand:
+            if len(scored) > 1 and scored[0] in self.hand:
+                self._record_scored(start, word)
+                return
+        self._record(start, word, main_score * word_multiplier + cross_score, letters_from_hand)
+
+
+    def _record_scored(self,
+                       start,
+                       word):
+        """scores and records a play found through the GADDAG from scratch, with
+        blanks assigned the way the game does: left to right, only once the real
+        letter has run out
+
+        Args:
+            start (int): square of the first letter in the line
+            word (str): word played
+        """
+        tiles = self.tiles[self.line]
+        rack = {}
+        for letter in self.hand:
+            rack[letter] = rack.get(letter, 0) + 1
+        main_score = 0
+        word_multiplier = 1
+        cross_score = 0
+        letters_from_hand = []
+        for i, letter in enumerate(word):
+            pos = start + i
+            if tiles[pos] is not None:
+                main_score += self.letter_scores[tiles[pos]]
+                continue
+            blank = not rack.get(letter, 0)
+            if blank:
+                letters_from_hand.append(letter + '-')
+            else:
+                rack[letter] -= 1
+                letters_from_hand.append(letter)
+            letter_score, multiplier, letter_cross_score = self._score_letter(pos, letter, blank)
+            main_score += letter_score
+            word_multiplier *= multiplier
+            cross_score += letter_cross_score
+        self._record(start, word, main_score * word_multiplier + cross_score, letters_from_hand)
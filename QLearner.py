@@ -2,6 +2,9 @@ import random as rand
 
 import numpy as np
 
+from ExperienceBuffer import ExperienceBuffer
+from SparseQTable import SparseQTable
+
 
 class QLearner(object):
     """
@@ -23,6 +26,14 @@ class QLearner(object):
     :type dyna: int
     :param verbose: If “verbose” is True, your code can print out information for debugging.
     :type verbose: bool
+    :param batched_dyna: If True, the dyna updates of each step are applied as one vectorized batch, see batched_dyna_update.
+    :type batched_dyna: bool
+    :param experience_capacity: The most experiences kept for the dyna updates, the oldest are overwritten first.
+    :type experience_capacity: int
+    :param experiences: Experiences to start from, for example loaded with ExperienceBuffer.load. A new buffer of experience_capacity is used if None.
+    :type experiences: ExperienceBuffer
+    :param sparse: If True, Q is a SparseQTable that stores only the states visited, which can be any integers such as the keys of StateEncoder, and num_states is ignored.
+    :type sparse: bool
     """
     def __init__(
         self,
@@ -34,6 +45,10 @@ class QLearner(object):
         radr=0.99,
         dyna=0,
         verbose=False,
+        batched_dyna=False,
+        experience_capacity=100000,
+        experiences=None,
+        sparse=False,
     ):
         """
         Constructor method
@@ -48,8 +63,14 @@ class QLearner(object):
         self.dyna = dyna
         self.s = 0
         self.a = 0
-        self.Q = np.zeros((self.num_states, self.num_actions))
-        self.experiences = []
+        if sparse:
+            self.Q = SparseQTable(self.num_actions)
+        else:
+            self.Q = np.zeros((self.num_states, self.num_actions))
+        self.batched_dyna = batched_dyna
+        if experiences is None:
+            experiences = ExperienceBuffer(experience_capacity)
+        self.experiences = experiences
 
     def querysetstate(self, s):
         """
@@ -83,15 +104,18 @@ class QLearner(object):
         self.Q[self.s][self.a] = (1 - self.alpha)*self.Q[self.s][self.a] + \
                                  self.alpha*(r + self.gamma * self.Q[s_prime][a_prime])
 
-        self.experiences.append([self.s, self.a, s_prime, r])
+        self.experiences.append(self.s, self.a, s_prime, r)
 
         if self.dyna != 0:
-            exp_list = np.random.randint(0, len(self.experiences), size=self.dyna)
-            for i in range(0,self.dyna):
-                ds, da, dsp, dr = self.experiences[exp_list[i]]
-                dap = np.argmax(self.Q[dsp])
-                self.Q[ds][da] = (1 - self.alpha) * self.Q[ds][da] + \
-                                         self.alpha * (dr + self.gamma * self.Q[dsp][dap])
+            if self.batched_dyna:
+                self.batched_dyna_update()
+            else:
+                states, actions, next_states, rewards = self.experiences.sample(self.dyna)
+                for ds, da, dsp, dr in zip(states.tolist(), actions.tolist(),
+                                           next_states.tolist(), rewards.tolist()):
+                    dap = np.argmax(self.Q[dsp])
+                    self.Q[ds][da] = (1 - self.alpha) * self.Q[ds][da] + \
+                                             self.alpha * (dr + self.gamma * self.Q[dsp][dap])
 
         if np.random.rand() < self.rar:
             action = np.random.randint(0, self.num_actions)
@@ -105,3 +129,29 @@ class QLearner(object):
         if self.verbose:
             print(f"s = {s_prime}, a = {action}, r={r}")
         return action
+
+    def batched_dyna_update(self):
+        """
+        Apply self.dyna planning updates as one batch. The experiences are sampled
+        as index arrays and every target r + gamma * max Q[s'] is computed from the
+        Q table as it was before the batch, with one vectorized max.
+
+        When a (s, a) pair is sampled k times its updates are combined: the pair
+        moves towards the mean of its k targets as far as k sequential updates
+        towards that target would, Q = t + (1 - alpha)**k * (Q - t). This is
+        exactly the sequential result when the k targets are equal, and unlike
+        adding the k updates it can't overshoot the targets. The result doesn't
+        depend on the order of the batch.
+        """
+        states, actions, next_states, rewards = self.experiences.sample(self.dyna)
+        targets = rewards + self.gamma * self.Q[next_states].max(axis=1)
+
+        # group the duplicate (s, a) pairs of the batch. The pairs are compared as
+        # rows rather than flattened to s * num_actions + a, which would overflow
+        # for the hashed states of a SparseQTable
+        pairs, inverse, counts = np.unique(np.stack((states, actions), axis=1), axis=0,
+                                           return_inverse=True, return_counts=True)
+        mean_targets = np.bincount(inverse.reshape(-1), weights=targets) / counts
+        rows, cols = pairs[:, 0], pairs[:, 1]
+        keep = (1 - self.alpha) ** counts
+        self.Q[rows, cols] = keep * self.Q[rows, cols] + (1 - keep) * mean_targets
@@ -1,40 +1,66 @@
 import json
 import random
-from Trie import Trie
+import numpy as np
+from Dawg import Dawg
 """module that creates a scrabble game board
 """
 
+# bit of each letter in a cross-check mask
+LETTER_BITS = {chr(ord('A') + i): 1 << i for i in range(26)}
+# cross-check of a square that any letter can be played on
+ALL_LETTERS = (1 << 26) - 1
+
+# premium squares of the board, shown on the empty squares of ScrabbleBoard.board
+PREMIUM_SQUARES = [
+    ['3W', ' ', ' ', '2L', ' ', ' ', ' ', '3W', ' ', ' ', ' ', '2L', ' ', ' ', '3W'],
+    [' ', '2W', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '2W', ' '],
+    [' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' '],
+    ['2L', ' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' ', '2L'],
+    [' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' '],
+    [' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' '],
+    [' ', ' ', '2L', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2L', ' ', ' '],
+    ['3W', ' ', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', ' ', '3W'],
+    [' ', ' ', '2L', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2L', ' ', ' '],
+    [' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' '],
+    [' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' '],
+    ['2L', ' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' ', '2L'],
+    [' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' '],
+    [' ', '2W', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '2W', ' '],
+    ['3W', ' ', ' ', '2L', ' ', ' ', ' ', '3W', ' ', ' ', ' ', '2L', ' ', ' ', '3W']
+]
+# letter and word multiplier of each square
+LETTER_MULTIPLIERS = np.array([[{'2L': 2, '3L': 3}.get(square, 1) for square in row]
+                               for row in PREMIUM_SQUARES], dtype=np.uint8)
+WORD_MULTIPLIERS = np.array([[{'2W': 2, '3W': 3}.get(square, 1) for square in row]
+                             for row in PREMIUM_SQUARES], dtype=np.uint8)
+LETTER_MULTIPLIERS.flags.writeable = False
+WORD_MULTIPLIERS.flags.writeable = False
+
 class ScrabbleBoard:
     _dictionary = None
+    _gaddag = None
     """
     Represents a Scrabble board.
     """
     def __init__(self,
                  number_of_players,
                  loaded_trie,
-                 seed=10):
+                 seed=10,
+                 loaded_gaddag=None):
         """
         Initializes the Scrabble board as a 15x15 grid of empty squares, and the multiplier board.
         """
         if ScrabbleBoard._dictionary is None and loaded_trie is not None:
             ScrabbleBoard._dictionary = loaded_trie
-        self.board = [
-            ['3W', ' ', ' ', '2L', ' ', ' ', ' ', '3W', ' ', ' ', ' ', '2L', ' ', ' ', '3W'],
-            [' ', '2W', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '2W', ' '],
-            [' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' '],
-            ['2L', ' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' ', '2L'],
-            [' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' '],
-            [' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' '],
-            [' ', ' ', '2L', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2L', ' ', ' '],
-            ['3W', ' ', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', ' ', '3W'],
-            [' ', ' ', '2L', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2L', ' ', ' '],
-            [' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' '],
-            [' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' ', ' ', '2W', ' ', ' ', ' ', ' '],
-            ['2L', ' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' ', '2L'],
-            [' ', ' ', '2W', ' ', ' ', ' ', '2L', ' ', '2L', ' ', ' ', ' ', '2W', ' ', ' '],
-            [' ', '2W', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '3L', ' ', ' ', ' ', '2W', ' '],
-            ['3W', ' ', ' ', '2L', ' ', ' ', ' ', '3W', ' ', ' ', ' ', '2L', ' ', ' ', '3W']
-        ]
+        # optional GADDAG used by MoveGenerator to grow words in both directions
+        if ScrabbleBoard._gaddag is None and loaded_gaddag is not None:
+            ScrabbleBoard._gaddag = loaded_gaddag
+        # the board is stored as planes: the letter on each square (0 when empty,
+        # 1 to 26 for A to Z) and whether that tile is a blank
+        self.letters = np.zeros((15, 15), dtype=np.uint8)
+        self.blanks = np.zeros((15, 15), dtype=bool)
+        # list of strings view of the planes, built when first asked for, see board
+        self._board = None
         self.number_of_players = number_of_players
         self.player_scores = [0] * number_of_players
         self.is_first_turn = True
@@ -49,13 +75,21 @@ class ScrabbleBoard:
         self.required_play_locations = {(7,7)}
         # a list of board squares string values that are valid to play on top of
         self.valid_play_contents = {'3W', '3L', '2W', '2L', ' '}
-        random.seed(seed)
+        # for each direction of play, a mask per square (indexed row*15+col) of the
+        # letters that form valid words perpendicular to that direction
+        self.cross_checks = {'across': [ALL_LETTERS] * 225, 'down': [ALL_LETTERS] * 225}
+        # for each direction of play, the summed score per square of the tiles in the
+        # perpendicular word a letter played there would join, -1 if there is none
+        self.cross_sums = {'across': [-1] * 225, 'down': [-1] * 225}
+        # each game draws from its own generator, so games sharing a process
+        # don't change each other's draws
+        self.random = random.Random(seed)
         self.board_state = []
         for i in range(15):
             for j in range(15):
                 if (i,j) in self.required_play_locations:
                     self.board_state.append(1)
-                elif self.board[i][j] in self.valid_play_contents:
+                elif not self.letters[i, j]:
                     self.board_state.append(0)
                 else:
                     self.board_state.append(2)
@@ -63,7 +97,8 @@ class ScrabbleBoard:
 
         with open('letter_distribution.json', 'r') as f:
             self.letters_to_draw_from = json.load(f)
-            # Flatten the dictionary into a list of letters
+            # Flatten the dictionary into a list of letters. The order of the list
+            # doesn't matter, tiles are drawn from random positions in it
             self.bag_list= [letter for letter, count in self.letters_to_draw_from.items() for _ in range(count)]
         with open('letter_points.json', 'r') as f:
             self.letter_scores = json.load(f)
@@ -76,6 +111,51 @@ class ScrabbleBoard:
                 self.letters_not_on_board[0] = count
 
 
+    def __getstate__(self):
+        """leaves the cached board view out of copies and pickles, it is rebuilt
+        from the planes when next needed
+        """
+        state = self.__dict__.copy()
+        state['_board'] = None
+        return state
+
+
+    @property
+    def board(self):
+        """list of strings view of the board. Each square holds its tile ('A', or
+        'A-' for a blank played as an A) or, when empty, its premium marker from
+        PREMIUM_SQUARES. The view is cached and kept in step with the planes by
+        set_tile, so it must not be written to directly
+
+        Returns:
+            List[List[str]]: the board
+        """
+        if self._board is None:
+            self._board = [[chr(code + 64) + ('-' if blank else '') if code else premium
+                            for code, blank, premium in zip(codes, blanks, premiums)]
+                           for codes, blanks, premiums in zip(self.letters.tolist(),
+                                                              self.blanks.tolist(),
+                                                              PREMIUM_SQUARES)]
+        return self._board
+
+
+    def set_tile(self,
+                 row,
+                 col,
+                 tile):
+        """puts a tile on an empty square
+
+        Args:
+            row (int): row of the square
+            col (int): column of the square
+            tile (str): the letter, followed by '-' if it is a blank
+        """
+        self.letters[row, col] = ord(tile[0]) - 64
+        self.blanks[row, col] = len(tile) > 1
+        if self._board is not None:
+            self._board[row][col] = tile
+
+
     def get_player_scores(self):
         """return the list of scores of the players in the game
 
@@ -124,12 +204,13 @@ class ScrabbleBoard:
         if num_letters > len(self.bag_list):
             num_letters = len(self.bag_list)
 
-        drawn_letters = random.sample(self.bag_list, num_letters)
-
-        # Update the counts of the drawn letters
-        for letter in drawn_letters:
-            self.bag_list = self.bag_list[0:self.bag_list.index(letter)] \
-                + self.bag_list[self.bag_list.index(letter)+1:]
+        bag_list = self.bag_list
+        drawn_letters = []
+        for _ in range(num_letters):
+            # swap the drawn tile with the last one so it can be popped in constant time
+            index = self.random.randrange(len(bag_list))
+            bag_list[index], bag_list[-1] = bag_list[-1], bag_list[index]
+            drawn_letters.append(bag_list.pop())
 
         return drawn_letters
 
@@ -154,6 +235,47 @@ class ScrabbleBoard:
         hand += self.draw_letters(len(letters_to_replace))
         self.put_letters_back(letters_to_replace)
 
+    def snapshot_bag(self,
+                     with_random=False):
+        """copies the contents of the bag, so draws can be taken back with restore_bag
+
+        Args:
+            with_random (bool, optional): also copy the state of the game's random
+                generator, so the same letters are drawn again after restoring.
+                Defaults to False.
+
+        Returns:
+            tuple (bag_list, random_state): the letters in the bag and the
+                generator state, None when with_random is False
+        """
+        return self.bag_list[:], self.random.getstate() if with_random else None
+
+
+    def fork_random(self):
+        """copies the game's random generator, so numbers can be drawn from its
+        current state without changing the game's own draws
+
+        Returns:
+            random.Random: a new generator in the same state as the game's
+        """
+        rng = random.Random()
+        rng.setstate(self.random.getstate())
+        return rng
+
+
+    def restore_bag(self,
+                    snapshot):
+        """puts the bag back to a snapshot taken by snapshot_bag
+
+        Args:
+            snapshot (tuple): snapshot returned by snapshot_bag
+        """
+        bag_list, random_state = snapshot
+        self.bag_list[:] = bag_list
+        if random_state is not None:
+            self.random.setstate(random_state)
+
+
     def get_num_letters_left(self):
         """Returns the number of letters left in the draw pile
 
@@ -186,33 +308,16 @@ class ScrabbleBoard:
         Returns:
             tuple: Two lists of integers representing the letter and word multipliers respectively.
         """
-        letter_multiplier_list = []
-        word_multiplier_list = []
-        for i in range(len(word)):
-            if direction == 'across':
-                multiplier = self.board[row][col + i]
-            elif direction == 'down':
-                multiplier = self.board[row + i][col]
-            else:
-                raise ValueError("Direction must be 'across' or 'down'.")
-
-            # Convert multiplier to number
-            if multiplier == '2L':
-                letter_multiplier_list.append(2)
-                word_multiplier_list.append(1)
-            elif multiplier == '3L':
-                letter_multiplier_list.append(3)
-                word_multiplier_list.append(1)
-            elif multiplier == '2W':
-                letter_multiplier_list.append(1)
-                word_multiplier_list.append(2)
-            elif multiplier == '3W':
-                letter_multiplier_list.append(1)
-                word_multiplier_list.append(3)
-            else:  # No multiplier
-                letter_multiplier_list.append(1)
-                word_multiplier_list.append(1)
-
+        if direction == 'across':
+            squares = (row, slice(col, col + len(word)))
+        elif direction == 'down':
+            squares = (slice(row, row + len(word)), col)
+        else:
+            raise ValueError("Direction must be 'across' or 'down'.")
+        # premiums only count on the squares the word covers that are still empty
+        empty = self.letters[squares] == 0
+        letter_multiplier_list = np.where(empty, LETTER_MULTIPLIERS[squares], 1).tolist()
+        word_multiplier_list = np.where(empty, WORD_MULTIPLIERS[squares], 1).tolist()
         return letter_multiplier_list, word_multiplier_list
 
 
@@ -239,11 +344,13 @@ class ScrabbleBoard:
         """
         
         score, word, letters_from_hand = self.calculate_turn_score(row, col, word, hand, direction)
+        placed = []
         if self.can_play_word(row, col, word, direction):
             if direction == 'across':
                 for i, letter in enumerate(word):
-                    if self.board[row][col + i] in self.valid_play_contents:
-                        self.board[row][col + i] = letter
+                    if not self.letters[row, col + i]:
+                        self.set_tile(row, col + i, letter)
+                        placed.append((row, col + i))
                         self.board_state[(row)*15+col+i] = 2
                         if len(letter) > 1:
                             self.letters_not_on_board[0] -= 1
@@ -254,8 +361,9 @@ class ScrabbleBoard:
                             self.required_play_locations.remove((row,col+i))
             elif direction == 'down':
                 for i, letter in enumerate(word):
-                    if self.board[row + i][col] in self.valid_play_contents:
-                        self.board[row + i][col] = letter
+                    if not self.letters[row + i, col]:
+                        self.set_tile(row + i, col, letter)
+                        placed.append((row + i, col))
                         self.board_state[(row+i)*15+col] = 2
                         if len(letter) > 1:
                             self.letters_not_on_board[0] -= 1
@@ -269,6 +377,7 @@ class ScrabbleBoard:
             return False
 
         self.add_new_valid_locations(row, col, direction, len(word))
+        self.update_cross_checks(placed)
         self.num_moves += 1
 
         self.is_first_turn = False
@@ -287,6 +396,82 @@ class ScrabbleBoard:
             return True
 
 
+    def apply_move(self,
+                   row,
+                   col,
+                   word,
+                   direction,
+                   player,
+                   hand):
+        """places a word like place_word, returning a record that undo_move can
+        use to take the move back. The record also keeps the bag, so the letters
+        drawn to refill the hand after the move are returned by undo_move too
+
+        Args:
+            row (int): The starting row to place the word.
+            col (int): The starting column to place the word.
+            word (str): The word to be placed.
+            direction (str): The direction to place the word. Must be 'across' or 'down'.
+            player (int): The player index
+            hand (List[char]): letters in the player's hand
+
+        Returns:
+            dict: undo record of the move, its 'placed' entry holds the result of place_word
+        """
+        if direction == 'across':
+            squares = [(row, col + i) for i in range(len(word)) if col + i < 15]
+        else:
+            squares = [(row + i, col) for i in range(len(word)) if row + i < 15]
+        record = {
+            'squares': [square for square in squares if not self.letters[square]],
+            'board_state': self.board_state[:],
+            'letters_not_on_board': self.letters_not_on_board[:],
+            'num_letter_locations': len(self.letter_locations),
+            'required_play_locations': set(self.required_play_locations),
+            'cross_checks': {key: value[:] for key, value in self.cross_checks.items()},
+            'cross_sums': {key: value[:] for key, value in self.cross_sums.items()},
+            'player_scores': self.player_scores[:],
+            'bag': self.snapshot_bag(),
+            'num_moves': self.num_moves,
+            'is_first_turn': self.is_first_turn,
+            'is_game_over': self.is_game_over,
+            'winner': self.winner,
+        }
+        record['placed'] = self.place_word(row, col, word, direction, player, hand)
+        return record
+
+
+    def undo_move(self,
+                  record):
+        """takes back a move made with apply_move, restoring the board, scores,
+        bag, anchors and counters to what they were before it. Moves must be
+        undone in the reverse order they were applied
+
+        Args:
+            record (dict): undo record returned by apply_move
+        """
+        for row, col in record['squares']:
+            self.letters[row, col] = 0
+            self.blanks[row, col] = False
+            if self._board is not None:
+                self._board[row][col] = PREMIUM_SQUARES[row][col]
+        # lists are restored in place since player states hold references to them
+        self.board_state[:] = record['board_state']
+        self.letters_not_on_board[:] = record['letters_not_on_board']
+        del self.letter_locations[record['num_letter_locations']:]
+        self.required_play_locations = record['required_play_locations']
+        for key, value in record['cross_checks'].items():
+            self.cross_checks[key][:] = value
+        for key, value in record['cross_sums'].items():
+            self.cross_sums[key][:] = value
+        self.player_scores[:] = record['player_scores']
+        self.restore_bag(record['bag'])
+        self.num_moves = record['num_moves']
+        self.is_first_turn = record['is_first_turn']
+        self.is_game_over = record['is_game_over']
+        self.winner = record['winner']
+
+
     def add_new_valid_locations(self,
                                 row,
                                 col,
@@ -312,7 +497,7 @@ class ScrabbleBoard:
                     row_eval = row + j
                     for i in range(num_squares):
                         col_eval = col + i
-                        if self.board[row_eval][col_eval] in self.valid_play_contents:
+                        if not self.letters[row_eval, col_eval]:
                             self.required_play_locations.add((row_eval,col_eval))
                             self.board_state[row_eval*15 + col_eval] = 1
                 # this code checks the squares before and after the word in the play direction
@@ -320,14 +505,14 @@ class ScrabbleBoard:
                     col_eval = col+j
                     if col_eval < 0:
                         continue
-                    elif self.board[row][col_eval] in self.valid_play_contents:
+                    elif not self.letters[row, col_eval]:
                         self.required_play_locations.add((row,col_eval))
                         self.board_state[row*15 + col_eval] = 1
                 else:
                     col_eval = col+num_squares
                     if col_eval > 14:
                         continue
-                    elif self.board[row][col_eval] in self.valid_play_contents:
+                    elif not self.letters[row, col_eval]:
                         self.required_play_locations.add((row,col_eval))
                         self.board_state[row*15 + col_eval] = 1
 
@@ -336,7 +521,7 @@ class ScrabbleBoard:
                     col_eval = col + j
                     for i in range(num_squares):
                         row_eval = row + i
-                        if self.board[row_eval][col_eval] in self.valid_play_contents:
+                        if not self.letters[row_eval, col_eval]:
                             self.required_play_locations.add((row_eval,col_eval))
                             self.board_state[row_eval*15 + col_eval] = 1
                 # this code checks the squares before and after the word in the play direction
@@ -344,20 +529,142 @@ class ScrabbleBoard:
                     row_eval = row+j
                     if row_eval < 0:
                         continue
-                    elif self.board[row_eval][col] in self.valid_play_contents:
+                    elif not self.letters[row_eval, col]:
                         self.required_play_locations.add((row_eval,col))
                         self.board_state[row_eval*15 + col] = 1
                 else:
                     row_eval = row+num_squares
                     if row_eval > 14:
                         continue
-                    elif self.board[row_eval][row_eval] in self.valid_play_contents:
+                    elif not self.letters[row_eval, col]:
                         self.required_play_locations.add((row_eval,col))
                         self.board_state[row_eval*15 + col] = 1
             else:
                 raise ValueError("Direction must be 'across' or 'down'.")
 
 
+    def update_cross_checks(self,
+                            squares):
+        """recomputes the cross-checks of the empty squares at either end of the
+        lines of tiles running through newly placed tiles. These are the only
+        squares whose perpendicular words a placement can change
+
+        Args:
+            squares (List[tuple]): row and column of each newly placed tile
+        """
+        for row, col in squares:
+            # the column through the tile constrains across plays above and below it
+            start = row
+            while start > 0 and self.letters[start - 1, col]:
+                start -= 1
+            end = row
+            while end < 14 and self.letters[end + 1, col]:
+                end += 1
+            for row_eval in (start - 1, end + 1):
+                if 0 <= row_eval <= 14:
+                    self.update_cross_square(row_eval, col, 'across')
+            # the row through the tile constrains down plays left and right of it
+            start = col
+            while start > 0 and self.letters[row, start - 1]:
+                start -= 1
+            end = col
+            while end < 14 and self.letters[row, end + 1]:
+                end += 1
+            for col_eval in (start - 1, end + 1):
+                if 0 <= col_eval <= 14:
+                    self.update_cross_square(row, col_eval, 'down')
+
+
+    def update_cross_square(self,
+                            row,
+                            col,
+                            direction):
+        """recomputes the cross-check and cross-sum of an empty square
+
+        Args:
+            row (int): row of the square
+            col (int): column of the square
+            direction (str): direction of play
+        """
+        before, after = self.get_perp_tiles(row, col, direction)
+        self.cross_checks[direction][row*15 + col] = self.compute_cross_check(before, after)
+        if before or after:
+            self.cross_sums[direction][row*15 + col] = \
+                sum(self.letter_scores[tile] for tile in before + after)
+        else:
+            self.cross_sums[direction][row*15 + col] = -1
+
+
+    def get_perp_tiles(self,
+                       row,
+                       col,
+                       direction):
+        """gets the tiles directly before and after an empty square, perpendicular
+        to the direction of play
+
+        Args:
+            row (int): row of the square
+            col (int): column of the square
+            direction (str): direction of play
+
+        Raises:
+            ValueError: if direction is not across or down
+
+        Returns:
+            tuple (before, after):
+                before (List[str]): board contents of the tiles before the square
+                after (List[str]): board contents of the tiles after the square
+        """
+        if direction == 'across':
+            codes = self.letters[:, col].tolist()
+            cells = [line[col] for line in self.board]
+            pos = row
+        elif direction == 'down':
+            codes = self.letters[row].tolist()
+            cells = self.board[row]
+            pos = col
+        else:
+            raise ValueError("Direction must be 'across' or 'down'.")
+        start = pos
+        while start > 0 and codes[start - 1]:
+            start -= 1
+        end = pos
+        while end < 14 and codes[end + 1]:
+            end += 1
+        return cells[start:pos], cells[pos + 1:end + 1]
+
+
+    def compute_cross_check(self,
+                            before,
+                            after):
+        """computes the mask of letters that can be played on an empty square
+        without forming an invalid word perpendicular to the direction of play
+
+        Args:
+            before (List[str]): tiles before the square, see get_perp_tiles
+            after (List[str]): tiles after the square
+
+        Returns:
+            int: mask of the allowed letters, see LETTER_BITS
+        """
+        if not before and not after:
+            return ALL_LETTERS
+        mask = 0
+        cursor = self._dictionary.root_cursor()
+        for tile in before:
+            cursor = cursor.step(tile[0])
+            if cursor is None:
+                return 0
+        for letter, child in cursor.children():
+            for tile in after:
+                child = child.step(tile[0])
+                if child is None:
+                    break
+            if child is not None and child.is_word:
+                mask |= LETTER_BITS[letter]
+        return mask
+
+
     def game_over(self):
         """This function will be called when the game is complete
         """        
@@ -553,36 +860,36 @@ class ScrabbleBoard:
             i = 1
             # get the first index of the branched word
             while row-i >= 0:
-                if self.board[row-i][col] not in self.valid_play_contents:
+                if self.letters[row-i, col]:
                     start = row-i
                     i += 1
                 else:
                     break
             ind = start
             # get the fully formed word
-            while ind < 15 and (self.board[ind][col] not in self.valid_play_contents or ind == row):
+            while ind < 15 and (self.letters[ind, col] or ind == row):
                 if ind == row:
                     out += letter[0]
                 else:
-                    out += self.board[ind][col][0]
+                    out += chr(self.letters[ind, col] + 64)
                 ind += 1
         elif direction == 'across':
             start = col
             i = 1
             # get the first index of the branched word
             while col-i >= 0:
-                if self.board[row][col-i] not in self.valid_play_contents:
+                if self.letters[row, col-i]:
                     start = col-i
                     i += 1
                 else:
                     break
             ind = start
             # get the fully formed word
-            while ind < 15 and (self.board[row][ind] not in self.valid_play_contents or ind == col):
+            while ind < 15 and (self.letters[row, ind] or ind == col):
                 if ind == col:
                     out += letter[0]
                 else:
-                    out += self.board[row][ind][0]
+                    out += chr(self.letters[row, ind] + 64)
                 ind += 1
         return out, start
 
@@ -604,6 +911,50 @@ class ScrabbleBoard:
         return True
     
     
+    def check_cross_checks(self,
+                           row,
+                           col,
+                           word,
+                           direction):
+        """checks that a word fits the tiles already on the board and that every
+        letter it places is allowed by the cross-check of its square
+
+        Args:
+            row (int): row of first letter of word
+            col (int): column of first letter of word
+            word (str): word to play
+            direction (str): direction of play
+
+        Raises:
+            ValueError: if direction is not across or down
+
+        Returns:
+            bool: whether all perpendicular words formed are valid
+        """
+        if direction == 'across':
+            step = 1
+            if col + len(word) > 15:
+                return False
+        elif direction == 'down':
+            step = 15
+            if row + len(word) > 15:
+                return False
+        else:
+            raise ValueError("direction must be 'across' or 'down'")
+        cross_checks = self.cross_checks[direction]
+        letters = self.letters.ravel()
+        index = row*15 + col
+        for letter in word:
+            code = letters[index]
+            if not code:
+                if not cross_checks[index] & LETTER_BITS.get(letter[0], 0):
+                    return False
+            elif code != ord(letter[0]) - 64:
+                return False
+            index += step
+        return True
+
+
     def calculate_turn_score(self,
                              row,
                              col,
@@ -628,33 +979,26 @@ class ScrabbleBoard:
                     come from the player's hand
         """
         score = 0
-        # this checks the validity of all the perpendicular words and adds them to a list of tuples
-        # in order to calculate their contribution to the score
-        perp_locations, perp_words = self.get_perp_words(row, col, word, direction)
-        valid = self.check_validity(perp_words)
+        # the letters placed on empty squares must pass the squares' cross-checks,
+        # which replaces looking every perpendicular word up in the dictionary
+        valid = self.check_cross_checks(row, col, word, direction)
         if not valid:
             return 0, None, None
-        else:
-            for i, perp_word in enumerate(perp_words):
-                perp_row = perp_locations[i][0]
-                perp_col = perp_locations[i][1]
-                perp_dir = perp_locations[i][2]
-                perp_word = perp_word[0]
-                letter_multipliers, word_multipliers = self.get_multipliers(perp_row,
-                                                                            perp_col,
-                                                                            perp_word,
-                                                                            perp_dir)
-                perp_word, letters_from_hand = self.get_score_input(perp_row,
-                                                                    perp_col,
-                                                                    perp_dir,
-                                                                    perp_word,
-                                                                    hand)
-                score += self.calculate_word_score(perp_word,
-                                                    letter_multipliers,
-                                                    word_multipliers,
-                                                    len(letters_from_hand))
 
         letter_multipliers, word_multipliers = self.get_multipliers(row, col, word, direction)
+        # each perpendicular word scores the cached sum of its tiles plus the placed
+        # letter, which counts as a blank when that letter is not in the hand
+        cross_sums = self.cross_sums[direction]
+        letters = self.letters.ravel()
+        step = 1 if direction == 'across' else 15
+        index = row*15 + col
+        for i, letter in enumerate(word):
+            if cross_sums[index] >= 0 and not letters[index]:
+                letter_score = self.letter_scores[letter[0]] if letter[0] in hand else 0
+                score += (cross_sums[index] + letter_score * letter_multipliers[i]) \
+                    * word_multipliers[i]
+            index += step
+
         word, letters_from_hand = self.get_score_input(row, col, direction, word, hand)
         score += self.calculate_word_score(word,
                                             letter_multipliers,
@@ -687,7 +1031,7 @@ class ScrabbleBoard:
         letters_from_hand = []
         for ind, letter in enumerate(word):
             if direction == 'across':
-                if self.board[row][col+ind] not in self.valid_play_contents:
+                if self.letters[row, col+ind]:
                     word[ind] = self.board[row][col+ind]
                 else:
                     # adding in length check to prevent constant appending of '-'
@@ -701,7 +1045,7 @@ class ScrabbleBoard:
                             word[ind] = letter + '-'
                     letters_from_hand.append(word[ind])
             elif direction == 'down':
-                if self.board[row+ind][col] not in self.valid_play_contents:
+                if self.letters[row+ind, col]:
                     word[ind] = self.board[row+ind][col]
                 else:
                     # adding in length check to prevent constant appending of '-'
@@ -0,0 +1,191 @@
+import time
+from contextlib import contextmanager
+"""module that collects instrumentation of a Brute.get_play call
+"""
+
+# phases of the move search whose wall time is measured. generate is the anchor
+# based MoveGenerator, which get_play methods 3 to 5 use instead of the others
+PHASES = ['get_prefixes', 'get_words', 'can_play_word', 'calculate_turn_score', 'generate']
+
+
+class _CountingDictionary:
+    """
+    Stands in for a Dawg while a search is instrumented, counting the searches
+    started on it: each search() call and each cursor taken from the root.
+    Everything else is passed through to the Dawg. Nothing is counted once the
+    count is None, see SearchStats.instrument_generator.
+    """
+    def __init__(self, dawg, stats):
+        self.dawg = dawg
+        self.stats = stats
+
+
+    def search(self, word):
+        if self.stats.dictionary_searches is not None:
+            self.stats.dictionary_searches += 1
+        return self.dawg.search(word)
+
+
+    def root_cursor(self):
+        if self.stats.dictionary_searches is not None:
+            self.stats.dictionary_searches += 1
+        return self.dawg.root_cursor()
+
+
+    def __getattr__(self, name):
+        return getattr(self.dawg, name)
+
+
+class SearchStats:
+    """
+    Instrumentation of one Brute.get_play call: the wall time and calls of each
+    phase of the search (see PHASES), the dictionary searches started, the
+    dictionary nodes the recursions visited and how many candidate words were
+    generated, scored and found legal. The dictionary searches are None for
+    the anchor based MoveGenerator, which doesn't start searches.
+
+    Nothing in the search checks whether it is instrumented. instrument wraps
+    the player's and game's methods in counting versions for the duration of
+    the call, as instance attributes that shadow the class's, so a search that
+    isn't instrumented runs exactly the code it would without this module.
+    Phase times are inclusive, get_words counts the recursion below it.
+    """
+    def __init__(self):
+        self.method = None
+        self.seconds = 0.0
+        self.phase_seconds = {phase: 0.0 for phase in PHASES}
+        self.phase_calls = {phase: 0 for phase in PHASES}
+        self.dictionary_searches = 0
+        self.nodes = 0
+        self.candidates_generated = 0
+        self.candidates_scored = 0
+        self.candidates_legal = 0
+
+
+    def _timed(self, phase, function):
+        """wraps a function to add its wall time and calls to a phase
+
+        Args:
+            phase (str): phase of PHASES
+            function (callable): bound method to wrap
+
+        Returns:
+            callable: the wrapped method
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.phase_seconds[phase] += time.perf_counter() - start
+                self.phase_calls[phase] += 1
+        return timed
+
+
+    def _counted(self, function):
+        """wraps a recursion step to count the nodes it visits
+
+        Args:
+            function (callable): bound method to wrap
+
+        Returns:
+            callable: the wrapped method
+        """
+        def counted(*args, **kwargs):
+            self.nodes += 1
+            return function(*args, **kwargs)
+        return counted
+
+
+    def _get_words(self, function):
+        timed = self._timed('get_words', function)
+        def get_words(*args, **kwargs):
+            words = timed(*args, **kwargs)
+            self.candidates_generated += len(words)
+            return words
+        return get_words
+
+
+    def _calculate_turn_score(self, function):
+        timed = self._timed('calculate_turn_score', function)
+        def calculate_turn_score(*args, **kwargs):
+            result = timed(*args, **kwargs)
+            self.candidates_scored += 1
+            # the score is (0, None, None) when the word breaks a cross-check
+            if result[1] is not None:
+                self.candidates_legal += 1
+            return result
+        return calculate_turn_score
+
+
+    def instrument_generator(self, generator):
+        """instruments a MoveGenerator. Every play it generates is legal and
+        scored, so the three candidate counts are the plays generated. It walks
+        the dictionary from a single root cursor, stepping it one letter at a
+        time, so there are no dictionary searches to compare with the other
+        methods' and they are reported as None. The nodes it expands are counted
+        instead
+
+        Args:
+            generator (MoveGenerator): generator to instrument
+        """
+        self.dictionary_searches = None
+        generator._options = self._counted(generator._options)
+        timed = self._timed('generate', generator.generate)
+        def generate():
+            plays = timed()
+            self.candidates_generated += len(plays)
+            self.candidates_scored += len(plays)
+            self.candidates_legal += len(plays)
+            return plays
+        generator.generate = generate
+
+
+    @contextmanager
+    def instrument(self, player, method):
+        """instruments a player and its game for one get_play call
+
+        Args:
+            player (Brute): player making the call
+            method (int): get_play method called
+        """
+        game = player.game
+        self.method = method
+        player.stats = self
+        player.get_prefixes = self._timed('get_prefixes', player.get_prefixes)
+        player.get_words = self._get_words(player.get_words)
+        player._extend_words = self._counted(player._extend_words)
+        player._extend_prefixes = self._counted(player._extend_prefixes)
+        game.can_play_word = self._timed('can_play_word', game.can_play_word)
+        game.calculate_turn_score = self._calculate_turn_score(game.calculate_turn_score)
+        game._dictionary = _CountingDictionary(game._dictionary, self)
+        if game._gaddag is not None:
+            game._gaddag = _CountingDictionary(game._gaddag, self)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds += time.perf_counter() - start
+            player.stats = None
+            for name in ['get_prefixes', 'get_words', '_extend_words', '_extend_prefixes']:
+                del player.__dict__[name]
+            for name in ['can_play_word', 'calculate_turn_score', '_dictionary', '_gaddag']:
+                game.__dict__.pop(name, None)
+
+
+    def as_dict(self):
+        """
+        Returns:
+            dict: the stats, JSON serializable for logging
+        """
+        return {
+            'method': self.method,
+            'seconds': self.seconds,
+            'phase_seconds': dict(self.phase_seconds),
+            'phase_calls': dict(self.phase_calls),
+            'dictionary_searches': self.dictionary_searches,
+            'nodes': self.nodes,
+            'candidates_generated': self.candidates_generated,
+            'candidates_scored': self.candidates_scored,
+            'candidates_legal': self.candidates_legal,
+        }
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+class SparseQTable(object):
+    """
+    Q table that only stores rows for the states it has seen, for state spaces
+    too large for a dense table, e.g. the keys of StateEncoder. States can be
+    any integers. Each new state is given the next row of a dense array that
+    doubles in size when full, so memory grows with the states visited.
+
+    It is indexed like the dense table QLearner uses otherwise: Q[s] is the
+    row of state s, Q[states] the rows of an array of states and
+    Q[states, actions] single entries, and entries are set the same ways. A
+    state's row is created, all zeros, the first time it is indexed.
+
+    :param num_actions: The number of actions available.
+    :type num_actions: int
+    :param initial_rows: The number of rows allocated up front.
+    :type initial_rows: int
+    """
+    def __init__(self, num_actions=4, initial_rows=1024):
+        """
+        Constructor method
+        """
+        self.num_actions = num_actions
+        self.values = np.zeros((max(1, initial_rows), num_actions))
+        # row of each state seen
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def row(self, s):
+        """
+        Find the row of a state, creating it if the state is new
+
+        :param s: The state
+        :type s: int
+        :return: The index of the state's row in values
+        :rtype: int
+        """
+        row = self.rows.get(s)
+        if row is None:
+            row = len(self.rows)
+            if row == len(self.values):
+                self.values = np.concatenate((self.values, np.zeros_like(self.values)))
+            self.rows[s] = row
+        return row
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            states, actions = key
+            return self._index(states), actions
+        if isinstance(key, np.ndarray):
+            return np.fromiter((self.row(s) for s in key.tolist()), dtype=np.intp, count=len(key))
+        return self.row(int(key))
+
+    def __getitem__(self, key):
+        """
+        Rows of single states are views, so Q[s][a] = x updates the table.
+        They stay valid until a new state is added.
+        """
+        index = self._index(key)
+        return self.values[index]
+
+    def __setitem__(self, key, value):
+        index = self._index(key)
+        self.values[index] = value
+
+    def save(self, file_name):
+        """
+        Save the table to a .npz file
+
+        :param file_name: The file to write
+        :type file_name: str
+        """
+        np.savez(file_name,
+                 states=np.fromiter(self.rows.keys(), dtype=np.int64, count=len(self.rows)),
+                 values=self.values[:len(self.rows)])
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        Load a table written by save
+
+        :param file_name: The file to read
+        :type file_name: str
+        :return: The table
+        :rtype: SparseQTable
+        """
+        with np.load(file_name) as data:
+            values = data['values']
+            table = cls(values.shape[1], len(values))
+            table.values[:len(values)] = values
+            table.rows = {s: row for row, s in enumerate(data['states'].tolist())}
+        return table
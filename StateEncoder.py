@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class StateEncoder(object):
+    """
+    Maps the states of Brute.get_state to integer keys with Zobrist hashing, so
+    they can index a QLearner with a sparse Q table. Each state is a vector of
+    features: the 225 squares of board followed by the 27 counts of letters_left
+    and of letters_in_hand. Every (feature, value) pair is given a random 64-bit
+    code and a state's key is the XOR of the codes of its features' values.
+
+    Distinct states collide with probability about n**2 / 2**(bits+1) for n
+    states, which is negligible for the default 63 bits.
+
+    :param seed: The seed of the random codes. Keys are only comparable between encoders with the same seed.
+    :type seed: int
+    :param bits: The number of bits of the keys, at most 63 so keys fit the int64 arrays of ExperienceBuffer.
+    :type bits: int
+    :param max_value: The largest value a feature can take. The board squares take 0 to 2 and the letter counts at most 12.
+    :type max_value: int
+    """
+    def __init__(self, seed=0, bits=63, max_value=15):
+        """
+        Constructor method, draws the codes
+        """
+        if not 1 <= bits <= 63:
+            raise ValueError("bits must be between 1 and 63")
+        self.num_features = 225 + 27 + 27
+        self.max_value = max_value
+        self.mask = np.uint64((1 << bits) - 1)
+        rng = np.random.default_rng(seed)
+        self.codes = rng.integers(0, 2**64, size=(self.num_features, max_value + 1),
+                                  dtype=np.uint64, endpoint=False)
+        self.features = np.arange(self.num_features)
+
+    def encode(self, state):
+        """
+        Compute the key of a state
+
+        :param state: The state, as returned by Brute.get_state
+        :type state: dict
+        :return: The key, between 0 and 2**bits - 1
+        :rtype: int
+        """
+        values = np.concatenate((state['board'], state['letters_left'], state['letters_in_hand']))
+        if len(values) != self.num_features:
+            raise ValueError("state must have 225 board squares and 27 of each letter count")
+        if values.min() < 0 or values.max() > self.max_value:
+            raise ValueError("state has a feature outside 0 to " + str(self.max_value))
+        key = np.bitwise_xor.reduce(self.codes[self.features, values.astype(np.intp)])
+        return int(key & self.mask)
@@ -10,6 +10,55 @@ class TrieNode:
         self.children = {}
         self.is_end_of_word = False
 
+class TrieCursor:
+    """
+    Handle on a node of a Trie that can be stepped one letter at a time, so
+    searches that extend a prefix don't restart from the root.
+    """
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        """
+        Initializes the cursor at the given node.
+
+        Args:
+            node (TrieNode): The node the cursor points at.
+        """
+        self.node = node
+
+    @property
+    def is_word(self):
+        """
+        Returns:
+            bool: True if the letters stepped so far form a word.
+        """
+        return self.node.is_end_of_word
+
+    def step(self, letter):
+        """
+        Extends the current prefix by one letter.
+
+        Args:
+            letter (char): The letter to append.
+
+        Returns:
+            TrieCursor: The cursor for the extended prefix, or None if it is not a valid prefix.
+        """
+        child = self.node.children.get(letter)
+        if child is None:
+            return None
+        return TrieCursor(child)
+
+    def children(self):
+        """
+        Iterates over the letters that extend the current prefix.
+
+        Yields:
+            tuple (letter, cursor): each letter and the cursor for the extended prefix
+        """
+        for letter, child in self.node.children.items():
+            yield letter, TrieCursor(child)
+
 class Trie:
     """
     Represents a Trie (or Prefix Tree) data structure.
@@ -52,3 +101,9 @@ class Trie:
             node = node.children[char]
         return node.is_end_of_word, True
 
+    def root_cursor(self):
+        """
+        Returns:
+            TrieCursor: A cursor at the root of the Trie (the empty prefix).
+        """
+        return TrieCursor(self.root)
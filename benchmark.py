@@ -0,0 +1,198 @@
+"""benchmarks move generation: replays each position of benchmark_positions.json
+and times Brute.get_play on it for each method, reporting the moves generated per
+second, the latency distribution and the peak memory of each method. The results can be
+saved as a baseline and later runs compared against it
+
+    python benchmark.py --methods 1 3 4 --save-baseline benchmark_baseline.json
+    python benchmark.py --methods 1 3 4 --baseline benchmark_baseline.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+from brute import Brute
+from Dawg import load_lexicon
+from ScrabbleBoard import ScrabbleBoard
+from SearchStats import SearchStats
+
+# how much slower than the baseline a method's median latency may get before
+# the comparison reports it as a regression
+REGRESSION_THRESHOLD = 1.2
+
+
+def load_positions(file_name='benchmark_positions.json'):
+    """reads the benchmark corpus. Each position is a name, the rack to move with
+    and the moves leading to it, each as [row, col, word, direction, hand] where
+    hand is the rack the word was played from (blanks as spaces)
+
+    Args:
+        file_name (str, optional): the corpus file. Defaults to 'benchmark_positions.json'.
+
+    Returns:
+        List[dict]: the positions
+    """
+    with open(file_name, 'r') as file:
+        return json.load(file)['positions']
+
+
+def set_up_position(position, loaded_trie):
+    """replays the moves of a position on a new game
+
+    Args:
+        position (dict): position from the corpus
+        loaded_trie (Dawg): the lexicon
+
+    Raises:
+        ValueError: if one of the moves can't be played
+
+    Returns:
+        Brute: the player to move, holding the position's rack
+    """
+    game = ScrabbleBoard(2, loaded_trie)
+    for number, (row, col, word, direction, hand) in enumerate(position['moves']):
+        if game.place_word(row, col, word, direction, number % 2, list(hand)) is False:
+            raise ValueError("can't replay " + word + " in position " + position['name'])
+    return Brute(game, len(position['moves']) % 2, list(position['rack']))
+
+
+def run_method(positions, loaded_trie, method, repeat=1):
+    """times get_play for one method over every position. The moves generated and
+    the peak memory are measured in a separate pass, under SearchStats and
+    tracemalloc, which would otherwise slow the timed runs. The moves generated
+    are the legal plays the search found, most methods only return the best one
+
+    Args:
+        positions (List[dict]): the corpus
+        loaded_trie (Dawg): the lexicon
+        method (int): Brute.get_play method
+        repeat (int, optional): timed runs per position. Defaults to 1.
+
+    Returns:
+        dict: moves and positions per second, latency statistics in milliseconds,
+            peak memory in KB, the per-position median latencies and moves
+            generated, and any errors raised
+    """
+    latencies = []
+    per_position = {}
+    errors = {}
+    for position in positions:
+        times = []
+        for _ in range(repeat):
+            player = set_up_position(position, loaded_trie)
+            start = time.perf_counter()
+            try:
+                player.get_play(method)
+            except Exception as error:
+                errors[position['name']] = repr(error)
+                break
+            times.append(time.perf_counter() - start)
+        if times:
+            latencies += times
+            per_position[position['name']] = 1000 * statistics.median(times)
+
+    peak = 0
+    moves = {}
+    for position in positions:
+        if position['name'] in errors:
+            continue
+        player = set_up_position(position, loaded_trie)
+        stats = SearchStats()
+        tracemalloc.start()
+        player.get_play(method, stats)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        moves[position['name']] = stats.candidates_legal
+
+    result = {'method': method, 'positions': len(per_position), 'errors': errors}
+    if latencies:
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+        # each position's moves are generated once per timed run
+        total_moves = repeat * sum(moves.values())
+        result.update({
+            'moves_per_second': total_moves / sum(latencies),
+            'positions_per_second': len(latencies) / sum(latencies),
+            'mean_ms': 1000 * statistics.fmean(latencies),
+            'p50_ms': 1000 * p50,
+            'p90_ms': 1000 * p90,
+            'p99_ms': 1000 * p99,
+            'max_ms': 1000 * max(latencies),
+            'peak_memory_kb': peak / 1024,
+            'per_position_ms': per_position,
+            'per_position_moves': moves,
+        })
+    return result
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """compares results with a baseline run
+
+    Args:
+        results (dict): results of this run, by method
+        baseline (dict): results of the baseline run, by method
+        threshold (float, optional): slowdown of the median latency or growth of
+            the peak memory counted as a regression. Defaults to REGRESSION_THRESHOLD.
+
+    Returns:
+        List[str]: a line for each method describing the change, regressions
+            start with 'REGRESSION'
+    """
+    lines = []
+    for method, result in results.items():
+        base = baseline.get(method)
+        if base is None or 'p50_ms' not in base or 'p50_ms' not in result:
+            lines.append("method " + method + ": no baseline")
+            continue
+        speed = result['p50_ms'] / base['p50_ms']
+        memory = result['peak_memory_kb'] / max(base['peak_memory_kb'], 1)
+        regression = speed > threshold or memory > threshold
+        lines.append(("REGRESSION " if regression else "")
+                     + "method " + method + ": median latency x" + str(round(speed, 2))
+                     + ", moves/s x" + str(round(result['moves_per_second']
+                                                 / max(base.get('moves_per_second', 0), 1e-9), 2))
+                     + ", peak memory x" + str(round(memory, 2)))
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="benchmarks Brute.get_play over a corpus of positions")
+    parser.add_argument('--methods', type=int, nargs='+', default=[0, 1, 2, 3, 4, 5],
+                        help="get_play methods to benchmark")
+    parser.add_argument('--positions', default='benchmark_positions.json', help="corpus file")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per position")
+    parser.add_argument('--output', default=None, help="file to write the results to")
+    parser.add_argument('--baseline', default=None, help="baseline results to compare against")
+    parser.add_argument('--save-baseline', default=None, help="file to save the results to as a baseline")
+    args = parser.parse_args()
+
+    loaded_trie = load_lexicon('Collins Scrabble Words (2019).txt', 'lexicon.dawg')
+    positions = load_positions(args.positions)
+    # keyed by the method as a string, so the results survive a round trip through JSON
+    results = {}
+    for method in args.methods:
+        result = run_method(positions, loaded_trie, method, args.repeat)
+        results[str(method)] = result
+        summary = "method " + str(method) + ": " + str(result['positions']) + " positions"
+        if 'p50_ms' in result:
+            summary += (", " + str(round(result['moves_per_second'])) + " moves/s"
+                        + ", " + str(round(result['positions_per_second'], 2)) + " positions/s"
+                         + ", p50 " + str(round(result['p50_ms'], 1)) + "ms"
+                         + ", p90 " + str(round(result['p90_ms'], 1)) + "ms"
+                         + ", peak " + str(round(result['peak_memory_kb'])) + "KB")
+        if result['errors']:
+            summary += ", " + str(len(result['errors'])) + " errors"
+        print(summary)
+
+    for file_name in (args.output, args.save_baseline):
+        if file_name is not None:
+            with open(file_name, 'w') as file:
+                json.dump(results, file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            lines = compare(results, json.load(file))
+        for line in lines:
+            print(line)
+        if any(line.startswith('REGRESSION') for line in lines):
+            sys.exit(1)
@@ -0,0 +1,232 @@
+"""module that plays out candidate moves to estimate their value, either in the
+calling process or in a pool of worker processes
+"""
+from copy import deepcopy
+import multiprocessing
+import pickle
+import time
+from Dawg import Dawg
+from ScrabbleBoard import ScrabbleBoard
+
+
+def play_rollouts(move, game, players, player, depth=2, shuffles=10, seeds=None, rollout_method=1,
+                  deadline=None):
+    """plays a candidate move followed by depth rounds of turns, once per shuffle
+    of the letters the other players could be holding. The game and players are
+    played in place and every turn is undone, so they are left as they were
+
+    Args:
+        move (tuple): candidate move as returned by Brute.get_play(2)
+        game (ScrabbleBoard): game to play out, shared by the players
+        players (List[Brute]): the players of the game
+        player (int): index of the player making the move
+        depth (int, optional): rounds of turns to play out. Defaults to 2.
+        shuffles (int, optional): number of rollouts. Defaults to 10.
+        seeds (List[int], optional): seed for the game's random generator at the start
+            of each rollout, one rollout is played per seed instead of shuffles.
+            Defaults to None, which continues from the generator's current state.
+        rollout_method (int, optional): Brute.get_play method the players use for
+            the turns after the move. Defaults to 1.
+        deadline (float, optional): time.monotonic() time to stop by. It is checked
+            before every turn, and a rollout that is cut short is taken back and not
+            counted, so this overruns by at most one turn. Defaults to None.
+
+    Returns:
+        tuple (total_diff, examples):
+            total_diff (int): change in the player's score lead, summed over the rollouts
+            examples (List[dict]): the player's state, labelled with the move and its
+                reward, for each rollout played to the end
+    """
+    total_diff = 0
+    examples = []
+    n = len(players)
+    if seeds is None:
+        seeds = [None] * shuffles
+    for seed in seeds:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        # get the state from the root player to store for later
+        state = deepcopy(players[player].get_state())
+        bag = game.snapshot_bag()
+        if seed is not None:
+            game.random.seed(seed)
+        hands = [p.hand[:] for p in players]
+        initial_diff = 0
+        for ind in range(n):
+            if ind == player:
+                initial_diff += game.player_scores[ind]
+            else:
+                initial_diff -= game.player_scores[ind]
+                # if the player isn't the primary player, recycle hand to give random letters
+                players[ind].recycle_hand()
+        # play the input move and the turns after it, keeping the undo records
+        records = []
+        timed_out = False
+        for i in range(depth):
+            for tp in range(n):
+                if deadline is not None and time.monotonic() >= deadline:
+                    timed_out = True
+                    break
+                if game.winner < 0:
+                    tp = (tp + player)%n
+                    if i == 0 and tp == player:
+                        record = players[tp].do_turn(move[1], move[2], move[3], move[4])
+                    else:
+                        play = players[tp].get_play(rollout_method)[0]
+                        record = players[tp].do_turn(play[0], play[1], play[2], play[3])
+                    if record is not None:
+                        records.append((tp, record))
+            if timed_out:
+                break
+        if not timed_out:
+            final_diff = game.player_scores[player] - sum(score for p, score in enumerate(game.player_scores) if p != player)
+            net_diff = final_diff - initial_diff
+            total_diff += net_diff
+            state['reward'] = net_diff
+            state['action'] = move
+            examples.append(state)
+        # take the turns back and undo the recycled hands for the next shuffle
+        for tp, record in reversed(records):
+            players[tp].undo_turn(record)
+        game.restore_bag(bag)
+        for p, hand in zip(players, hands):
+            p.hand = hand
+        if timed_out:
+            break
+    return total_diff, examples
+
+
+def init_worker(lexicon_file, gaddag_file):
+    """loads the lexicons once in each worker process. The files are memory-mapped,
+    so the workers share their pages with each other and the parent
+
+    Args:
+        lexicon_file (str): binary lexicon written by Dawg.save
+        gaddag_file (str): binary GADDAG written by Dawg.save, or None
+    """
+    ScrabbleBoard._dictionary = Dawg.open(lexicon_file)
+    if gaddag_file is not None:
+        ScrabbleBoard._gaddag = Dawg.open(gaddag_file)
+
+
+def _rollout_task(args):
+    """plays one rollout of a candidate move in a worker process
+
+    Args:
+        args (tuple): the arguments below
+        position (bytes): the pickled game and players
+        index (int): index of the move among the candidates
+        move (tuple): candidate move
+        player (int): index of the player making the move
+        depth (int): rounds of turns to play out
+        seed (int): seed of the rollout
+        rollout_method (int): Brute.get_play method for the turns after the move
+        deadline (float): time.monotonic() time to stop by, or None
+
+    Returns:
+        tuple (index, total_diff, examples): the move's index and the result of
+            play_rollouts, which has no examples if the deadline cut it short
+    """
+    position, index, move, player, depth, seed, rollout_method, deadline = args
+    game, players = pickle.loads(position)
+    total_diff, examples = play_rollouts(move, game, players, player, depth, seeds=[seed],
+                                         rollout_method=rollout_method, deadline=deadline)
+    return index, total_diff, examples
+
+
+class RolloutPool:
+    """
+    Pool of long-lived worker processes that play out candidate moves in
+    parallel. The workers open the lexicons once when they start, and each call
+    only sends them the pickled position and the candidate moves. Each rollout
+    is a task of its own, so all the workers are used even when only a few
+    moves are left to play out.
+    """
+    def __init__(self,
+                 lexicon_file,
+                 gaddag_file=None,
+                 workers=None):
+        """
+        Starts the worker processes.
+
+        Args:
+            lexicon_file (str): binary lexicon written by Dawg.save, see load_lexicon
+            gaddag_file (str, optional): binary GADDAG for the workers' move
+                generators. Defaults to None.
+            workers (int, optional): number of worker processes. Defaults to the
+                number of CPUs.
+        """
+        self.pool = multiprocessing.Pool(workers,
+                                         initializer=init_worker,
+                                         initargs=(lexicon_file, gaddag_file))
+
+
+    def evaluate(self, game, players, player, moves, depth=2, shuffles=10, seeds=None,
+                 rollout_method=1, deadline=None):
+        """plays out each candidate move in the workers, see play_rollouts
+
+        Args:
+            game (ScrabbleBoard): current game, left unchanged
+            players (List[Brute]): the players of the game
+            player (int): index of the player to move
+            moves (List[tuple]): candidate moves as returned by Brute.get_play(2)
+            depth (int, optional): rounds of turns to play out. Defaults to 2.
+            shuffles (int, optional): rollouts per move. Defaults to 10.
+            seeds (List[List[int]], optional): rollout seeds of each move, see
+                play_rollouts. Defaults to None, which draws shuffles seeds per move.
+            rollout_method (int, optional): Brute.get_play method for the turns
+                after the moves. Defaults to 1.
+            deadline (float, optional): time.monotonic() time to stop by. Results
+                still outstanding then are not waited for, and the tasks still
+                queued stop at their first turn. Defaults to None.
+
+        Returns:
+            tuple (results_list, counts, examples):
+                results_list (List[int]): total score differential of each move
+                counts (List[int]): number of rollouts of each move played to the end
+                examples (List[dict]): labelled states from all the rollouts
+        """
+        # pickled once here rather than once per task
+        position = pickle.dumps((game, players), pickle.HIGHEST_PROTOCOL)
+        if seeds is None:
+            # the rollouts are spread over the workers, so each needs its own seed
+            # rather than continuing the game's generator. They are drawn from a
+            # copy of it, which leaves the game's own draws unchanged
+            rng = game.fork_random()
+            seeds = [[rng.getrandbits(32) for _ in range(shuffles)] for _ in moves]
+        # one task per rollout rather than per move, so every worker is kept busy
+        # however few moves there are
+        tasks = [(position, index, move, player, depth, seed, rollout_method, deadline)
+                 for index, (move, move_seeds) in enumerate(zip(moves, seeds))
+                 for seed in move_seeds]
+        results_list = [0] * len(moves)
+        counts = [0] * len(moves)
+        examples = []
+        outcomes = self.pool.imap_unordered(_rollout_task, tasks)
+        for _ in tasks:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.monotonic())
+            try:
+                index, total_diff, rollout_examples = outcomes.next(timeout)
+            except multiprocessing.TimeoutError:
+                break
+            results_list[index] += total_diff
+            counts[index] += len(rollout_examples)
+            examples += rollout_examples
+        return results_list, counts, examples
+
+
+    def close(self):
+        """stops the worker processes
+        """
+        self.pool.close()
+        self.pool.join()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
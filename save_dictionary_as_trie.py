@@ -1,31 +1,37 @@
-from  Trie import Trie
-import pickle
+from Dawg import Dawg, build_gaddag, file_checksum
+import sys
 import time
 
 def load_words_into_trie(file_name):
     """
-    Reads words from a text file and inserts each word into the Trie.
+    Reads words from a text file and compiles them into a Dawg.
 
     Args:
         file_name (str): The name of the file to read the words from.
 
     Returns:
-        Trie: The Trie loaded with words.
+        Dawg: The Dawg loaded with words.
     """
-    trie = Trie()
     with open(file_name, 'r') as file:
-        for line in file:
-            word = line.strip()  # remove newline character
-            trie.insert(word)
-    return trie
+        # remove newline characters
+        return Dawg(line.strip() for line in file)
 
 # load the words from the dictionary file into trie
 start = time.time()
 loaded_trie = load_words_into_trie('Collins Scrabble Words (2019).txt')
 
-# Save trie_instance to a file
-with open('trie.pkl', 'wb') as file:
-    pickle.dump(loaded_trie, file)
+# Save the lexicon to a file that simulation.py can memory-map
+loaded_trie.save('lexicon.dawg', file_checksum('Collins Scrabble Words (2019).txt'))
 
 end = time.time()
-print("time to load trie: " + str(end-start))
\ No newline at end of file
+print("time to load trie: " + str(end-start))
+
+# optionally build the GADDAG used for move generation as well, it is
+# much larger than the forward lexicon and takes longer to build
+if '--gaddag' in sys.argv:
+    start = time.time()
+    with open('Collins Scrabble Words (2019).txt', 'r') as file:
+        loaded_gaddag = build_gaddag(line.strip() for line in file)
+    loaded_gaddag.save('gaddag.dawg', file_checksum('Collins Scrabble Words (2019).txt'))
+    end = time.time()
+    print("time to load gaddag: " + str(end-start))
\ No newline at end of file
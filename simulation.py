@@ -1,112 +1,308 @@
 import time
-import os
-import pickle
+import math
+import sys
 from collections import Counter
 from copy import deepcopy
 import threading
-import json
 from ScrabbleBoard import ScrabbleBoard
 from brute import Brute
-from  Trie import Trie
+from Dawg import load_lexicon
+from ExampleWriter import ColumnarExampleWriter, ExampleWriter
+from rollout import RolloutPool, play_rollouts
 
 
-def load_words_into_trie(file_name):
+# rollout examples are streamed to shards in examples/, JSON Lines unless another
+# writer is set here before the first example is saved
+example_writer = None
+
+def saveExample(state, lock):
+    global example_writer
+    with lock:
+        if example_writer is None:
+            example_writer = ExampleWriter('examples')
+    example_writer.write(state)
+
+def thread_func(move, move_num, game, players, player, depth, results_list, lock, seeds=None,
+                rollout_method=1, deadline=None):
+    # copy the game once for this thread (the players share the copy), every shuffle
+    # is then played out on it in place and taken back with the undo records
+    temp_game, temp_players = deepcopy((game, players))
+    total_diff, examples = play_rollouts(move, temp_game, temp_players, player, depth, seeds=seeds,
+                                         rollout_method=rollout_method, deadline=deadline)
+    for state in examples:
+        saveExample(state, lock)
+    with lock:
+        # save to total diff as a metric to determine what move to use, with the
+        # number of rollouts played, which the deadline can cut short
+        results_list[move_num] = (total_diff, len(examples))
+
+def evaluate_moves(game, players, player, moves, depth=2, pool=None, seeds=None, rollout_method=1,
+                   deadline=None):
+    """plays out each candidate move, in the pool's worker processes if there is
+    a pool and otherwise in one thread per move. With a deadline and no pool the
+    threads are run one after another
+
+    Args:
+        game (ScrabbleBoard): current game, left unchanged
+        players (List[Brute]): the players of the game
+        player (int): index of the player to move
+        moves (List[tuple]): candidate moves as returned by Brute.get_play(2)
+        depth (int, optional): rounds of turns to play out. Defaults to 2.
+        pool (RolloutPool, optional): worker processes to use. Defaults to None.
+        seeds (List[List[int]], optional): rollout seeds of each move, see
+            play_rollouts. Defaults to None, which plays 10 rollouts per move.
+        rollout_method (int, optional): Brute.get_play method for the turns after
+            the moves. Defaults to 1.
+        deadline (float, optional): time.monotonic() time to stop by, rollouts not
+            finished by then are left out. Defaults to None.
+
+    Returns:
+        tuple (totals, counts):
+            totals (List[int]): total score differential of each move over its rollouts
+            counts (List[int]): number of rollouts played for each move
     """
-    Reads words from a text file and inserts each word into the Trie.
+    lock = threading.Lock()
+    if pool is not None:
+        # play the moves out in the pool's worker processes
+        totals, counts, examples = pool.evaluate(game, players, player, moves, depth, seeds=seeds,
+                                                 rollout_method=rollout_method, deadline=deadline)
+        for state in examples:
+            saveExample(state, lock)
+    else:
+        if seeds is None:
+            seeds = [None] * len(moves)
+        threads = []
+        move_num = 0
+        # Initialize the results list with None for each move
+        results_list = [None] * len(moves)
+        for move in moves:
+            threads.append(threading.Thread(target=thread_func, args=(move, move_num, game, players, player, depth, results_list, lock, seeds[move_num], rollout_method, deadline,)))
+            move_num += 1
+        if deadline is None:
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+        else:
+            # one move at a time, so a single rollout is in progress at the deadline
+            # rather than one per thread
+            for th in threads:
+                th.start()
+                th.join()
+        totals = [total_diff for total_diff, _ in results_list]
+        counts = [count for _, count in results_list]
+    return totals, counts
+
+def rollout_seeds(rng, num_moves, shuffles, common=False):
+    """draws the seeds of a batch of rollouts. With common random numbers every
+    move gets the same seeds, so rollout k of each move deals the opponents the
+    same racks and draws from the same bag order. The moves are then compared
+    under the same luck, which takes fewer rollouts to rank them reliably
 
     Args:
-        file_name (str): The name of the file to read the words from.
+        rng (random.Random): generator to draw the seeds from
+        num_moves (int): number of moves to play out
+        shuffles (int): rollouts per move
+        common (bool, optional): give every move the same seeds. Defaults to False.
 
     Returns:
-        Trie: The Trie loaded with words.
+        List[List[int]]: rollout seeds of each move
     """
-    trie = Trie()
-    with open(file_name, 'r') as file:
-        for line in file:
-            word = line.strip()  # remove newline character
-            trie.insert(word)
-    return trie
+    if common:
+        return [[rng.getrandbits(32) for _ in range(shuffles)]] * num_moves
+    return [[rng.getrandbits(32) for _ in range(shuffles)] for _ in range(num_moves)]
 
-def saveExample(state, lock):
-    with lock:
-        with open('examples.json', 'r') as f:
-            config = json.load(f)
-        if len(config["examples"]) == 0:
-            config["examples"] = [state]
-        else:
-            config["examples"].append(state)
-        with open('examples.json','w') as f:
-            json.dump(config, f)
-
-def thread_func(move, move_num, game, players, player, depth, results_list, lock):
-    total_diff = 0
-    for shuffle_num in range(10):
-        n = len(players)
-        # make a copy of the game to play out a couple turns
-        temp_game = deepcopy(game)
-        # get the state from the root player to store for later
-        state = deepcopy(players[player].get_state())
-        # play the input move
-        # make temp players list
-        temp_players = []
-        initial_diff = 0
-        for ind in range(n):
-            p = players[ind]
-            if ind == player:
-                initial_diff += temp_game.player_scores[ind]
-            else:
-                initial_diff -= temp_game.player_scores[ind]
-            temp_players.append(deepcopy(p))
-            temp_players[-1].update_game(temp_game)
-            if ind != player:
-                # if the player isn't the primary player, recycle hand to give random letters
-                temp_players[-1].recycle_hand()
-        for i in range(depth):
-            for tp in range(n):
-                if temp_game.winner < 0:
-                    tp = (tp + player)%n
-                    if i == 0 and tp == player:
-                        temp_players[tp].do_turn(move[1], move[2], move[3], move[4])
-                    else:
-                        play = temp_players[tp].get_play(1)[0]
-                        temp_players[tp].do_turn(play[0], play[1], play[2], play[3])
-        final_diff = temp_game.player_scores[player] - sum(score for p, score in enumerate(temp_game.player_scores) if p != player)
-        net_diff = final_diff - initial_diff
-        total_diff += net_diff
-        state['reward'] = net_diff
-        state['action'] = move
-        saveExample(state, lock)
-    with lock:
-        # save to total diff as a metric to determine what move to use
-        results_list[move_num] = total_diff
+def successive_halving(game, players, player, moves, budget, depth=2, pool=None, common=False,
+                       rollout_method=1):
+    """spends a budget of rollouts on the candidate moves by successive halving:
+    each round splits its share of the budget evenly between the remaining moves,
+    then drops the half with the lowest mean differential, so the rollouts go to
+    the moves that are still in contention
 
-def simulate(game, players, player, depth=2):
-    lock = threading.Lock()
-    moves = players[player].get_play(2)
+    Args:
+        game (ScrabbleBoard): current game, left unchanged
+        players (List[Brute]): the players of the game
+        player (int): index of the player to move
+        moves (List[tuple]): candidate moves as returned by Brute.get_play(2)
+        budget (int): most rollouts to play. A move needs at least one rollout to
+            be compared, so with fewer rollouts than moves the rounds stop early;
+            simulate passes at most budget moves
+        depth (int, optional): rounds of turns to play out. Defaults to 2.
+        pool (RolloutPool, optional): worker processes to use. Defaults to None.
+        common (bool, optional): use common random numbers, see rollout_seeds.
+            Defaults to False.
+        rollout_method (int, optional): Brute.get_play method for the turns after
+            the moves. Defaults to 1.
+
+    Returns:
+        tuple (best_move_index, totals, counts):
+            best_move_index (int): index of the move with the best mean differential
+            totals (List[int]): total differential of each move
+            counts (List[int]): number of rollouts of each move
+
+    Raises:
+        ValueError: if there are no moves. simulate passes instead of calling it then
+    """
+    if not moves:
+        raise ValueError("successive_halving needs at least one candidate move")
+    # the rollout seeds come from a copy of the game's generator, so the game's
+    # own draws aren't changed by simulating
+    rng = game.fork_random()
+    totals = [0] * len(moves)
+    counts = [0] * len(moves)
+    remaining = list(range(len(moves)))
+    rounds = max(1, math.ceil(math.log2(len(moves))))
+    for round_num in range(rounds):
+        if len(remaining) == 1:
+            break
+        # every remaining move gets at least one rollout, but never beyond the budget
+        shuffles = min(max(1, budget // (rounds * len(remaining))),
+                       (budget - sum(counts)) // len(remaining))
+        if shuffles == 0:
+            break
+        seeds = rollout_seeds(rng, len(remaining), shuffles, common)
+        round_totals, round_counts = evaluate_moves(game, players, player,
+                                                    [moves[i] for i in remaining],
+                                                    depth, pool, seeds, rollout_method)
+        for i, total_diff, count in zip(remaining, round_totals, round_counts):
+            totals[i] += total_diff
+            counts[i] += count
+        remaining.sort(key=lambda i: totals[i] / counts[i], reverse=True)
+        remaining = remaining[:math.ceil(len(remaining) / 2)]
+    best_move_index = max(remaining, key=lambda i: totals[i] / counts[i] if counts[i] else 0)
+    return best_move_index, totals, counts
+
+def anytime_rollouts(game, players, player, moves, deadline, depth=2, pool=None, budget=None,
+                     common=False, rollout_method=1):
+    """plays rounds of one rollout per candidate move until the deadline, so the
+    estimates keep improving for as long as there is time. The deadline is passed
+    down to the rollouts, which stop at it partway through a round, so it is
+    overrun by at most one turn of a rollout. If no rollout was played, the first
+    (highest scoring) move is best
+
+    Args:
+        game (ScrabbleBoard): current game, left unchanged
+        players (List[Brute]): the players of the game
+        player (int): index of the player to move
+        moves (List[tuple]): candidate moves as returned by Brute.get_play(2)
+        deadline (float): time.monotonic() time to stop by
+        depth (int, optional): rounds of turns to play out. Defaults to 2.
+        pool (RolloutPool, optional): worker processes to use. Defaults to None.
+        budget (int, optional): also stop once this many rollouts have been
+            played. Defaults to None.
+        common (bool, optional): use common random numbers, see rollout_seeds.
+            Defaults to False.
+        rollout_method (int, optional): Brute.get_play method for the turns after
+            the moves. Defaults to 1.
+
+    Returns:
+        tuple (best_move_index, totals, counts):
+            best_move_index (int): index of the move with the best mean differential
+            totals (List[int]): total differential of each move
+            counts (List[int]): number of rollouts of each move
+    """
+    # the rollout seeds come from a copy of the game's generator, see successive_halving
+    rng = game.fork_random()
+    totals = [0] * len(moves)
+    counts = [0] * len(moves)
+    while time.monotonic() < deadline and \
+            (budget is None or sum(counts) + len(moves) <= budget):
+        seeds = rollout_seeds(rng, len(moves), 1, common)
+        round_totals, round_counts = evaluate_moves(game, players, player, moves, depth, pool,
+                                                    seeds, rollout_method, deadline)
+        for i in range(len(moves)):
+            totals[i] += round_totals[i]
+            counts[i] += round_counts[i]
+    best_move_index = max(range(len(moves)), key=lambda i: totals[i] / counts[i] if counts[i] else 0)
+    return best_move_index, totals, counts
+
+def simulate(game, players, player, depth=2, pool=None, budget=None, time_limit=None, report=None,
+             common_random_numbers=False, rollout_method=1):
+    """picks a move for the player by playing out its best scoring candidate moves
+
+    Args:
+        game (ScrabbleBoard): current game, left unchanged
+        players (List[Brute]): the players of the game
+        player (int): index of the player to move
+        depth (int, optional): rounds of turns to play out. Defaults to 2.
+        pool (RolloutPool, optional): worker processes to use. Defaults to None.
+        budget (int, optional): most rollouts to play, shared out by successive
+            halving. Only the budget's best scoring candidates are considered when it
+            is below 10. Defaults to None, which plays 10 rollouts per candidate.
+        time_limit (float, optional): seconds to spend on the move, including finding
+            the candidates. Rollouts are played until then and the best move so far
+            is returned. The budget then caps the number of rollouts. Defaults to None.
+        report (dict, optional): if given, filled with the candidate 'moves', the
+            'totals' and 'rollouts' (counts) of their differentials, and the
+            'total_rollouts' played. Defaults to None.
+        common_random_numbers (bool, optional): play rollout k of every move with the
+            same opponent racks and bag order, see rollout_seeds. Defaults to False.
+        rollout_method (int, optional): Brute.get_play method the players use in the
+            rollouts, independent of the search for the candidates. Method 4 is the
+            quick bounded search. Defaults to 1.
+
+    Returns:
+        tuple: the chosen move, as returned by Brute.get_play(2), or
+            (0, None, None, None, None) to pass when there is no legal play
+    """
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit
+    # the candidates come from the anchor generator, which finds the plays of
+    # get_play(2) several times faster. With a time limit it stops at the deadline
+    moves = players[player].find_all_plays_anchor(deadline if time_limit is not None else None)
+    moves = sorted(moves, key=lambda tup: tup[0], reverse=True)
+    if not moves:
+        # no legal play, pass like Brute.get_play does
+        if report is not None:
+            report['moves'] = []
+            report['totals'] = []
+            report['rollouts'] = []
+            report['total_rollouts'] = 0
+        return (0, None, None, None, None)
+    # the rollouts label their examples with the player's state
+    players[player].update_state()
     if len(moves) > 10:
         moves = moves[0:10]
-    threads = []
-    move_num = 0
-    # Initialize the results list with None for each move
-    results_list = [None] * len(moves)
-    for move in moves:
-        threads.append(threading.Thread(target=thread_func, args=(move, move_num, game, players, player, depth, results_list, lock,)))
-        move_num += 1
-    for th in threads:
-        th.start()
-    for th in threads:
-        th.join()
-        
-    # After threads are done, analyze results_list to determine best move
-    best_move_index = results_list.index(max(results_list))
+    if budget is not None:
+        # every candidate needs a rollout, so a small budget also limits the candidates
+        moves = moves[0:max(1, budget)]
+    if time_limit is not None and time.monotonic() >= deadline:
+        # no time left after finding the candidates, play the best scoring one
+        best_move_index = 0
+        totals = [0] * len(moves)
+        counts = [0] * len(moves)
+    elif time_limit is not None:
+        # anytime: keep playing rollouts until the time is up
+        best_move_index, totals, counts = anytime_rollouts(game, players, player, moves,
+                                                           deadline, depth, pool, budget,
+                                                           common_random_numbers, rollout_method)
+    elif budget is None:
+        # every move gets its own seeds unless they are common. Left unseeded, the
+        # threads would all continue from the game's generator in the same state
+        seeds = rollout_seeds(game.fork_random(), len(moves), 10, common_random_numbers)
+        totals, counts = evaluate_moves(game, players, player, moves, depth, pool, seeds,
+                                        rollout_method)
+        # After threads are done, analyze results_list to determine best move
+        best_move_index = totals.index(max(totals))
+    else:
+        # adaptive: share the budget of rollouts out by successive halving
+        best_move_index, totals, counts = successive_halving(game, players, player, moves, budget,
+                                                             depth, pool, common_random_numbers,
+                                                             rollout_method)
+    if report is not None:
+        report['moves'] = moves
+        report['totals'] = totals
+        report['rollouts'] = counts
+        report['total_rollouts'] = sum(counts)
     print(best_move_index)
     return moves[best_move_index]
     
 
 
-def main(loaded_trie, seed, methods):
+def main(loaded_trie, seed, methods, loaded_gaddag=None, pool=None, budget=None, time_limit=None,
+         common_random_numbers=False, rollout_method=1):
     n = len(methods)
-    Game = ScrabbleBoard(n, loaded_trie, seed)
+    Game = ScrabbleBoard(n, loaded_trie, seed, loaded_gaddag)
     players = []
     for i in range(n):
         players.append(Brute(Game, i))
@@ -116,7 +312,13 @@ def main(loaded_trie, seed, methods):
     start = time.time()
     while Game.winner < 0:
         if methods[player] == 2:
-            play = simulate(Game, players, player)[1:]
+            report = {}
+            play = simulate(Game, players, player, pool=pool, budget=budget,
+                            time_limit=time_limit, report=report,
+                            common_random_numbers=common_random_numbers,
+                            rollout_method=rollout_method)[1:]
+            print("rollouts per candidate: " + str(report['rollouts'])
+                  + ", total " + str(report['total_rollouts']))
         else:
             play = players[player].get_play(methods[player])[0]
         players[player].do_turn(play[0], play[1], play[2], play[3])
@@ -127,41 +329,71 @@ def main(loaded_trie, seed, methods):
     print(Game.player_scores)
     print("time for one simulation: " + str(end-start))
 
-# load the words from the dictionary file into trie
-if os.path.isfile('trie.pkl'):
-    # Load trie_instance from a file
-    with open('trie.pkl', 'rb') as file:
-        loaded_trie = pickle.load(file)
-else:
-    loaded_trie = load_words_into_trie('Collins Scrabble Words (2019).txt')
-
-# initialize the board
-times_per_move = []
-times = []
-winners = []
-for seed in range(0,10):
-    b1 = 1
-    b2 = 2
-    main(loaded_trie, seed, [b1, b2])
-    # Game = ScrabbleBoard(2, loaded_trie, seed)
-    # brute_1 = Brute(Game, 0)
-    # brute_2 = Brute(Game, 1)
-    # brute_3 = Brute(Game, 2, method=0)
-    # brute_4 = Brute(Game, 3, method=0)
-    # i = 0
-    # ONE = True
-    # TWO = True
-    # THREE = True
-    # FOUR = True
-    # start = time.time()
-    # while ONE and TWO and THREE and FOUR:
-    #     ONE = brute_1.do_turn()
-    #     TWO = brute_2.do_turn()
-    # end = time.time()
-    # moves = Game.get_num_moves()
-    # winners.append(Game.get_winner())
-    # times_per_move.append((end-start)/moves)
-    # times.append(end-start)
-# print(Counter(winners))
-# print(sum(times)/len(times))
-# print(sum(times_per_move)/len(times_per_move))
\ No newline at end of file
+if __name__ == '__main__':
+    # open the lexicon file, rebuilding it if the dictionary file has changed
+    loaded_trie = load_lexicon('Collins Scrabble Words (2019).txt', 'lexicon.dawg')
+    # with --gaddag, moves are generated with the GADDAG. It isn't faster than
+    # the forward generator yet, so it is only loaded when asked for
+    loaded_gaddag = None
+    if '--gaddag' in sys.argv:
+        loaded_gaddag = load_lexicon('Collins Scrabble Words (2019).txt', 'gaddag.dawg', gaddag=True)
+    # simulation players play out their candidate moves in worker processes,
+    # one per CPU unless --workers is given
+    workers = None
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+    pool = RolloutPool('lexicon.dawg', 'gaddag.dawg' if loaded_gaddag is not None else None, workers)
+    # with --budget, simulation players share that many rollouts out adaptively
+    # between their candidate moves rather than playing 10 for each
+    budget = None
+    if '--budget' in sys.argv:
+        budget = int(sys.argv[sys.argv.index('--budget') + 1])
+    # with --time-limit, simulation players play rollouts for that many seconds a turn
+    time_limit = None
+    if '--time-limit' in sys.argv:
+        time_limit = float(sys.argv[sys.argv.index('--time-limit') + 1])
+    # with --crn, candidate moves are played out under the same shuffles
+    common_random_numbers = '--crn' in sys.argv
+    # with --rollout-method, the turns in the rollouts are played with that
+    # Brute.get_play method, e.g. 4 for the quick bounded search
+    rollout_method = 1
+    if '--rollout-method' in sys.argv:
+        rollout_method = int(sys.argv[sys.argv.index('--rollout-method') + 1])
+    # with --columnar, examples are saved as columnar NumPy shards for training
+    if '--columnar' in sys.argv:
+        example_writer = ColumnarExampleWriter('examples')
+
+    # initialize the board
+    times_per_move = []
+    times = []
+    winners = []
+    for seed in range(0,10):
+        b1 = 1
+        b2 = 2
+        main(loaded_trie, seed, [b1, b2], loaded_gaddag, pool, budget, time_limit,
+             common_random_numbers, rollout_method)
+        # Game = ScrabbleBoard(2, loaded_trie, seed)
+        # brute_1 = Brute(Game, 0)
+        # brute_2 = Brute(Game, 1)
+        # brute_3 = Brute(Game, 2, method=0)
+        # brute_4 = Brute(Game, 3, method=0)
+        # i = 0
+        # ONE = True
+        # TWO = True
+        # THREE = True
+        # FOUR = True
+        # start = time.time()
+        # while ONE and TWO and THREE and FOUR:
+        #     ONE = brute_1.do_turn()
+        #     TWO = brute_2.do_turn()
+        # end = time.time()
+        # moves = Game.get_num_moves()
+        # winners.append(Game.get_winner())
+        # times_per_move.append((end-start)/moves)
+        # times.append(end-start)
+    # print(Counter(winners))
+    # print(sum(times)/len(times))
+    # print(sum(times_per_move)/len(times_per_move))
+    pool.close()
+    if example_writer is not None:
+        example_writer.close()
@@ -0,0 +1,215 @@
+"""plays a tournament between Brute.get_play methods over a range of seeds, one
+game per seed, in parallel worker processes, and writes a JSON report of the
+results
+
+    python tournament.py --methods 1 3 --seeds 0 100 --workers 8 --output report.json
+"""
+import argparse
+import json
+import multiprocessing
+import statistics
+import time
+import numpy as np
+from brute import Brute
+from Dawg import load_lexicon
+from rollout import init_worker
+from ScrabbleBoard import ScrabbleBoard
+import simulation
+
+
+def play_game(seed, methods, simulate_options=None, max_moves=200):
+    """plays one game. The seats are rotated by the seed, so over consecutive
+    seeds every method gets to move first equally often
+
+    Args:
+        seed (int): seed of the game
+        methods (List[int]): Brute.get_play method of each player, 2 plays the
+            simulation player of simulation.simulate
+        simulate_options (dict, optional): keyword arguments for simulation.simulate.
+            Defaults to None.
+        max_moves (int, optional): turns after which the game is stopped. Defaults to 200.
+
+    Returns:
+        dict: the seed, and per player (in the order of methods) the final score
+            and the seconds taken by each of its turns, plus the number of moves
+    """
+    n = len(methods)
+    seats = [(seat + seed) % n for seat in range(n)]
+    game = ScrabbleBoard(n, ScrabbleBoard._dictionary, seed)
+    players = [Brute(game, seat) for seat in range(n)]
+    latencies = [[] for _ in range(n)]
+    seat = 0
+    passes = 0
+    turns = 0
+    while game.winner < 0 and turns < max_moves:
+        method = methods[seats[seat]]
+        start = time.perf_counter()
+        if method == 2:
+            # with no legal play simulate returns a None word, which passes like
+            # the get_play methods do
+            play = simulation.simulate(game, players, seat, **(simulate_options or {}))[1:]
+        else:
+            play = players[seat].get_play(method)[0]
+        latencies[seats[seat]].append(time.perf_counter() - start)
+        players[seat].do_turn(play[0], play[1], play[2], play[3])
+        turns += 1
+        # the game can't go on once every player has had to pass in a row
+        passes = passes + 1 if play[0] is None else 0
+        if passes == n:
+            break
+        seat = (seat + 1) % n
+    # worker processes exit without running atexit, so write out the examples now
+    if simulation.example_writer is not None:
+        simulation.example_writer.flush()
+    return {
+        'seed': seed,
+        'scores': [game.player_scores[seats.index(player)] for player in range(n)],
+        'latencies': latencies,
+        'moves': game.num_moves,
+    }
+
+
+def _play_game_task(args):
+    return play_game(*args)
+
+
+def percentiles(values):
+    """summarizes a list of per-turn latencies
+
+    Args:
+        values (List[float]): latencies in seconds
+
+    Returns:
+        dict: mean, p50, p90, p99 and max, in milliseconds
+    """
+    if not values:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+    return {
+        'mean_ms': 1000 * statistics.fmean(values),
+        'p50_ms': 1000 * p50,
+        'p90_ms': 1000 * p90,
+        'p99_ms': 1000 * p99,
+        'max_ms': 1000 * max(values),
+    }
+
+
+def summarize(methods, games):
+    """aggregates the results of the games into the tournament report
+
+    Args:
+        methods (List[int]): Brute.get_play method of each player
+        games (List[dict]): results returned by play_game
+
+    Returns:
+        dict: the report: per player the wins, win rate (draws count as half a
+            win), score and spread (its score minus the best other score), and
+            turn latency percentiles, plus the moves per game and each game's result
+    """
+    n = len(methods)
+    players = []
+    for player in range(n):
+        wins = 0
+        draws = 0
+        spreads = []
+        for result in games:
+            scores = result['scores']
+            best_other = max(score for other, score in enumerate(scores) if other != player)
+            spreads.append(scores[player] - best_other)
+            if scores[player] > best_other:
+                wins += 1
+            elif scores[player] == best_other:
+                draws += 1
+        scores = [result['scores'][player] for result in games]
+        players.append({
+            'method': methods[player],
+            'wins': wins,
+            'draws': draws,
+            'win_rate': (wins + draws / 2) / len(games) if games else 0,
+            'mean_score': statistics.fmean(scores) if games else 0,
+            'mean_spread': statistics.fmean(spreads) if games else 0,
+            'spread_stdev': statistics.pstdev(spreads) if games else 0,
+            'latency': percentiles([latency for result in games
+                                    for latency in result['latencies'][player]]),
+        })
+    moves = [result['moves'] for result in games]
+    return {
+        'methods': methods,
+        'games': len(games),
+        'players': players,
+        'moves_per_game': {
+            'mean': statistics.fmean(moves) if games else 0,
+            'min': min(moves, default=0),
+            'max': max(moves, default=0),
+        },
+        'results': [{'seed': result['seed'], 'scores': result['scores'], 'moves': result['moves']}
+                    for result in sorted(games, key=lambda result: result['seed'])],
+    }
+
+
+def run_tournament(methods, seeds, workers=None, simulate_options=None, max_moves=200,
+                   lexicon_file='lexicon.dawg', gaddag_file=None):
+    """plays one game per seed in a pool of worker processes
+
+    Args:
+        methods (List[int]): Brute.get_play method of each player
+        seeds (iterable(int)): seed of each game
+        workers (int, optional): number of worker processes. Defaults to the number of CPUs.
+        simulate_options (dict, optional): keyword arguments for simulation.simulate.
+            Defaults to None.
+        max_moves (int, optional): turns after which a game is stopped. Defaults to 200.
+        lexicon_file (str, optional): binary lexicon the workers open. Defaults to 'lexicon.dawg'.
+        gaddag_file (str, optional): binary GADDAG the workers open. Defaults to None.
+
+    Returns:
+        dict: the report, see summarize, with the wall time of the tournament
+    """
+    start = time.time()
+    tasks = [(seed, methods, simulate_options, max_moves) for seed in seeds]
+    with multiprocessing.Pool(workers, initializer=init_worker,
+                              initargs=(lexicon_file, gaddag_file)) as pool:
+        games = list(pool.imap_unordered(_play_game_task, tasks))
+    report = summarize(methods, games)
+    report['seconds'] = time.time() - start
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="plays Brute.get_play methods against each other")
+    parser.add_argument('--methods', type=int, nargs='+', default=[1, 3],
+                        help="get_play method of each player, 2 is the simulation player")
+    parser.add_argument('--seeds', type=int, nargs=2, default=[0, 10], metavar=('START', 'STOP'),
+                        help="play one game for each seed in range(START, STOP)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes, defaults to the number of CPUs")
+    parser.add_argument('--max-moves', type=int, default=200,
+                        help="turns after which a game is stopped")
+    parser.add_argument('--output', default='tournament.json', help="file to write the report to")
+    parser.add_argument('--rollout-method', type=int, default=1,
+                        help="get_play method used in the simulation player's rollouts")
+    parser.add_argument('--budget', type=int, default=None,
+                        help="rollouts per turn of the simulation player, see simulation.simulate")
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help="seconds per turn of the simulation player")
+    parser.add_argument('--gaddag', action='store_true',
+                        help="generate moves with the GADDAG rather than the forward lexicon")
+    args = parser.parse_args()
+
+    # build or refresh the lexicon file once here, the workers only open it
+    load_lexicon('Collins Scrabble Words (2019).txt', 'lexicon.dawg')
+    if args.gaddag:
+        load_lexicon('Collins Scrabble Words (2019).txt', 'gaddag.dawg', gaddag=True)
+    simulate_options = {
+        'rollout_method': args.rollout_method,
+        'budget': args.budget,
+        'time_limit': args.time_limit,
+    }
+    report = run_tournament(args.methods, range(*args.seeds), args.workers, simulate_options,
+                            args.max_moves,
+                            gaddag_file='gaddag.dawg' if args.gaddag else None)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    for player in report['players']:
+        print("method " + str(player['method']) + ": win rate " + str(round(player['win_rate'], 3))
+              + ", mean spread " + str(round(player['mean_spread'], 1)))
+    print("report written to " + args.output)